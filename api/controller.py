@@ -4,6 +4,9 @@ import asyncio
 import schedule
 from datetime import time
 from src.tasks.paper_task import daily_ingest_analyze
+from src.utils.embedding_utils import embed_model_stats
+from src.agents.assistant_step import stream_executor_stats
+from src.tools.paper_search_tool import query_embedding_cache, paper_result_cache, warm_up_paper_search
 import logging
 import re
 
@@ -73,8 +76,32 @@ async def enable_schedule(request: Request):
 def get_schedule():
     return {"execution_time": execution_time}
 
+# Load time and memory footprint of the shared embedding models
+@router.get("/embed_models")
+def get_embed_models():
+    return {"embed_models": embed_model_stats()}
+
+# Hit and miss counters of the retrieval caches
+@router.get("/cache/stats")
+def get_cache_stats():
+    return {
+        "query_embedding_cache": query_embedding_cache.stats(),
+        "paper_result_cache": paper_result_cache.stats(),
+    }
+
+# Thread count and queue depth of the shared executor writing streamed responses
+@router.get("/stream/stats")
+def get_stream_stats():
+    return {"stream_executor": stream_executor_stats()}
+
 
 # --- Startup ---
 @router.on_event("startup")
 async def start_schedule():
+    # Requests are served once the shared paper search handles are open and warm
+    try:
+        await asyncio.to_thread(warm_up_paper_search)
+    except Exception as e:
+        # A cold first query is better than an API that does not start
+        logging.warning(f"Paper search warm-up failed: {e}")
     asyncio.create_task(schedule_task())  # Initiate scheduling on app start
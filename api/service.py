@@ -11,7 +11,7 @@ from llama_index.core.callbacks import CallbackManager
 from src.agents.assistant_agent import AssistantAgent
 from src.agents.gemini_agent import GeminiForFunctionCalling
 from llama_index.core import Settings
-from src.tools.paper_search_tool import load_paper_search_tool, load_daily_paper_tool, load_get_time_tool
+from src.tools.paper_search_tool import load_paper_search_tool, load_paper_batch_search_tool, load_daily_paper_tool, load_get_time_tool
 from src.tools.web_search_tool import load_web_search_tool
 from src.tools.summarize_tool import load_summarize_tool
 from src.constants import SYSTEM_PROMPT
@@ -26,7 +26,12 @@ from src.constants import (
     SERVICE,
     TEMPERATURE,
     MODEL_ID,
-    STREAM
+    STREAM,
+    MAX_PARALLEL_TOOL_CALLS,
+    TOOL_TIMEOUT,
+    TOOL_TIMEOUTS,
+    TOOL_HEDGE_DELAY,
+    STREAM_WORKERS
 )
 load_dotenv(override=True)
 
@@ -41,12 +46,13 @@ class AssistantService:
         
     def load_tools(self):
         paper_search_tool = load_paper_search_tool()
+        paper_batch_search_tool = load_paper_batch_search_tool()
         paper_summarize_tool = load_summarize_tool()
         daily_paper_tool = load_daily_paper_tool()
         get_time_tool = load_get_time_tool()
         web_search_tool = load_web_search_tool()
         
-        return [paper_search_tool, paper_summarize_tool, daily_paper_tool, get_time_tool, web_search_tool]
+        return [paper_search_tool, paper_batch_search_tool, paper_summarize_tool, daily_paper_tool, get_time_tool, web_search_tool]
     
     def create_query_engine(self):
         """
@@ -75,7 +81,12 @@ class AssistantService:
                 verbose=True,
                 llm=llm,
                 system_prompt = SYSTEM_PROMPT,
-                callback_manager=self.callback_manager
+                callback_manager=self.callback_manager,
+                max_parallel_tool_calls=MAX_PARALLEL_TOOL_CALLS,
+                tool_timeout=TOOL_TIMEOUT,
+                tool_timeouts=TOOL_TIMEOUTS,
+                hedge_delay=TOOL_HEDGE_DELAY,
+                stream_workers=STREAM_WORKERS
             )
         
         return query_engine
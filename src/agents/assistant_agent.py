@@ -28,7 +28,7 @@ from llama_index.core.settings import Settings
 from llama_index.core.tools import BaseTool
 from llama_index.llms.openai import OpenAI
 from llama_index.llms.openai.utils import OpenAIToolCall
-from src.agents.assistant_step import AssistantAgentWorker
+from src.agents.assistant_step import AssistantAgentWorker, DEFAULT_MAX_PARALLEL_TOOL_CALLS, DEFAULT_STREAM_WORKERS
 
 DEFAULT_MAX_FUNCTION_CALLS = 5
 
@@ -57,6 +57,11 @@ class AssistantAgent(AgentRunner):
         callback_manager: Optional[CallbackManager] = None,
         tool_retriever: Optional[ObjectRetriever[BaseTool]] = None,
         tool_call_parser: Optional[Callable[[OpenAIToolCall], Dict]] = None,
+        max_parallel_tool_calls: int = DEFAULT_MAX_PARALLEL_TOOL_CALLS,
+        tool_timeout: Optional[float] = None,
+        tool_timeouts: Optional[Dict[str, float]] = None,
+        hedge_delay: Optional[float] = None,
+        stream_workers: int = DEFAULT_STREAM_WORKERS,
     ) -> None:
         """Init params."""
         callback_manager = callback_manager or llm.callback_manager
@@ -69,6 +74,11 @@ class AssistantAgent(AgentRunner):
             callback_manager=callback_manager,
             prefix_messages=prefix_messages,
             tool_call_parser=tool_call_parser,
+            max_parallel_tool_calls=max_parallel_tool_calls,
+            tool_timeout=tool_timeout,
+            tool_timeouts=tool_timeouts,
+            hedge_delay=hedge_delay,
+            stream_workers=stream_workers,
         )
         super().__init__(
             step_engine,
@@ -94,6 +104,11 @@ class AssistantAgent(AgentRunner):
         system_prompt: Optional[str] = None,
         prefix_messages: Optional[List[ChatMessage]] = None,
         tool_call_parser: Optional[Callable[[OpenAIToolCall], Dict]] = None,
+        max_parallel_tool_calls: int = DEFAULT_MAX_PARALLEL_TOOL_CALLS,
+        tool_timeout: Optional[float] = None,
+        tool_timeouts: Optional[Dict[str, float]] = None,
+        hedge_delay: Optional[float] = None,
+        stream_workers: int = DEFAULT_STREAM_WORKERS,
         **kwargs: Any,
     ) -> "AssistantAgent":
         """Create an OpenAIAgent from a list of tools.
@@ -140,4 +155,9 @@ class AssistantAgent(AgentRunner):
             callback_manager=callback_manager,
             default_tool_choice=default_tool_choice,
             tool_call_parser=tool_call_parser,
+            max_parallel_tool_calls=max_parallel_tool_calls,
+            tool_timeout=tool_timeout,
+            tool_timeouts=tool_timeouts,
+            hedge_delay=hedge_delay,
+            stream_workers=stream_workers,
         )
@@ -1,11 +1,15 @@
 """OpenAI agent worker."""
 
 import asyncio
+import contextvars
 import json
 import logging
+import threading
+import time
 import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from functools import partial
-from threading import Thread
+from types import MappingProxyType
 from typing import Any, Dict, List, Callable, Optional, Tuple, Union, cast, get_args
 import re
 
@@ -35,7 +39,8 @@ from llama_index.core.llms.llm import LLM
 from llama_index.core.memory import BaseMemory, ChatMemoryBuffer
 from llama_index.core.objects.base import ObjectRetriever
 from llama_index.core.settings import Settings
-from llama_index.core.tools import BaseTool, ToolOutput, adapt_to_async_tool
+from llama_index.core.tools import AsyncBaseTool, BaseTool, FunctionTool, ToolOutput, adapt_to_async_tool
+from llama_index.core.tools.function_tool import sync_to_async
 from llama_index.llms.openai import OpenAI
 from llama_index.llms.openai.utils import OpenAIToolCall
 
@@ -43,16 +48,107 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.WARNING)
 
 DEFAULT_MAX_FUNCTION_CALLS = 5
+DEFAULT_MAX_PARALLEL_TOOL_CALLS = 4
+DEFAULT_TOOL_WORKERS = 32
+DEFAULT_STREAM_WORKERS = 32
+
+# Shared by all workers, tool calls with a deadline run here so a hung call
+# can be abandoned. Threads cannot be killed, a hung call keeps its thread
+# until it returns, the bound keeps those from piling up.
+_tool_executor = ThreadPoolExecutor(max_workers=DEFAULT_TOOL_WORKERS, thread_name_prefix="tool")
+
+# Set when the tool call running in this context missed its deadline or lost
+# to a hedged call, see `tool_call_cancelled`
+_tool_cancel_event: contextvars.ContextVar[Optional[threading.Event]] = contextvars.ContextVar(
+    "tool_cancel_event", default=None
+)
+
+
+def tool_call_cancelled() -> bool:
+    """Whether the agent gave up on the current tool call. An abandoned call
+    keeps running, tools with side effects such as streaming to the chat check
+    this and stop.
+    """
+    cancel_event = _tool_cancel_event.get()
+    return cancel_event is not None and cancel_event.is_set()
+
 
+class ToolRegistry:
+    """Immutable lookup structures of a tool set, built once per tool set.
+
+    Holds the name to tool map, the OpenAI tool schemas sent with every LLM
+    call and the async adapters of the tools, so a step does not re-derive
+    the pydantic JSON schemas or rebuild the name map per tool call.
+    """
+
+    def __init__(self, tools: List[BaseTool]):
+        self.tools = tuple(tools)
+        self.name_to_tool = MappingProxyType({tool.metadata.name: tool for tool in self.tools})
+        self.name_to_async_tool = MappingProxyType(
+            {name: adapt_to_async_tool(tool) for name, tool in self.name_to_tool.items()}
+        )
+        self.openai_tools = tuple(tool.metadata.to_openai_tool() for tool in self.tools)
 
-def get_function_by_name(tools: List[BaseTool], name: str) -> BaseTool:
+    def matches(self, tools: List[BaseTool]) -> bool:
+        """Whether `tools` is the tool set of this registry, in the same order."""
+        return len(tools) == len(self.tools) and all(
+            tool is registered for tool, registered in zip(tools, self.tools)
+        )
+
+    def get_tool(self, name: str) -> BaseTool:
+        if name not in self.name_to_tool:
+            raise ValueError(f"Tool with name {name} not found")
+        return self.name_to_tool[name]
+
+    def get_async_tool(self, name: str) -> AsyncBaseTool:
+        self.get_tool(name)
+        return self.name_to_async_tool[name]
+
+
+def get_function_by_name(tools: Union[List[BaseTool], ToolRegistry], name: str) -> BaseTool:
     """Get function by name."""
+    if isinstance(tools, ToolRegistry):
+        return tools.get_tool(name)
     name_to_tool = {tool.metadata.name: tool for tool in tools}
     if name not in name_to_tool:
         raise ValueError(f"Tool with name {name} not found")
     return name_to_tool[name]
 
 
+def is_cacheable(tool: BaseTool) -> bool:
+    """Whether the tool declared that calls with the same arguments return the
+    same output within a task, by setting `tool.cacheable = True`. Tools with side
+    effects, such as streaming a message to the chat, must not opt in.
+    """
+    return getattr(tool, "cacheable", False)
+
+
+def is_idempotent(tool: BaseTool) -> bool:
+    """Whether the tool declared that running a call twice is harmless, by
+    setting `tool.idempotent = True`. Only those calls are hedged.
+    """
+    return getattr(tool, "idempotent", False)
+
+
+# Code of the wrapper llama-index puts around FunctionTools without an async function
+_SYNC_TO_ASYNC_CODE = sync_to_async(lambda: None).__code__
+
+
+def is_sync_tool(tool: BaseTool) -> bool:
+    """Whether the tool only has a sync implementation. The async path runs
+    those in the tool executor itself, llama-index would run them in an
+    executor without the caller context or block the event loop.
+    """
+    if isinstance(tool, FunctionTool):
+        return getattr(tool.async_fn, "__code__", None) is _SYNC_TO_ASYNC_CODE
+    return not isinstance(tool, AsyncBaseTool)
+
+
+def tool_cache_key(name: str, argument_dict: Dict) -> str:
+    """Tool name and canonical JSON of the arguments, independent of key order."""
+    return f"{name}:{json.dumps(argument_dict, sort_keys=True, separators=(',', ':'), default=str)}"
+
+
 def call_tool_with_error_handling(
     tool: BaseTool,
     input_dict: Dict,
@@ -122,7 +218,7 @@ def advanced_tool_call_parser(tool_call: OpenAIToolCall) -> Dict:
 
 
 def call_function(
-    tools: List[BaseTool],
+    tools: Union[List[BaseTool], ToolRegistry],
     tool_call: OpenAIToolCall,
     verbose: bool = False,
     tool_call_parser: Optional[Callable[[OpenAIToolCall], Dict]] = None,
@@ -187,7 +283,7 @@ def call_function(
 
 
 async def acall_function(
-    tools: List[BaseTool],
+    tools: Union[List[BaseTool], ToolRegistry],
     tool_call: OpenAIToolCall,
     verbose: bool = False,
     tool_call_parser: Optional[Callable[[OpenAIToolCall], Dict]] = None,
@@ -207,8 +303,12 @@ async def acall_function(
     if verbose:
         print("=== Calling Function ===")
         print(f"Calling function: {name} with args: {arguments_str}")
-    tool = get_function_by_name(tools, name)
-    async_tool = adapt_to_async_tool(tool)
+    if isinstance(tools, ToolRegistry):
+        tool = tools.get_tool(name)
+        async_tool = tools.get_async_tool(name)
+    else:
+        tool = get_function_by_name(tools, name)
+        async_tool = adapt_to_async_tool(tool)
     error_message: Optional[str] = None
     try:
         argument_dict = tool_call_parser(tool_call)
@@ -231,7 +331,14 @@ async def acall_function(
             ),
         )
 
-    output = await async_tool.acall(**argument_dict)
+    if is_sync_tool(tool):
+        # runs in a copy of the caller context, so the tool sees the cancel
+        # event of `acall_function_with_deadline`
+        output = await asyncio.get_running_loop().run_in_executor(
+            _tool_executor, contextvars.copy_context().run, partial(tool.call, **argument_dict)
+        )
+    else:
+        output = await async_tool.acall(**argument_dict)
     if verbose:
         print(f"Got output: {output!s}")
         print("========================\n")
@@ -248,6 +355,234 @@ async def acall_function(
     )
 
 
+def tool_timeout_output(
+    tool_call: OpenAIToolCall, timeout: float
+) -> Tuple[ChatMessage, ToolOutput]:
+    """Tool error returned to the LLM when a call missed its deadline."""
+    name = tool_call.function.name
+    error_message = f"Error: {name} did not respond within {timeout:g} seconds and was cancelled."
+    return (
+        ChatMessage(
+            content=error_message,
+            role=MessageRole.TOOL,
+            additional_kwargs={
+                "name": name,
+                "tool_call_id": tool_call.id,
+            },
+        ),
+        ToolOutput(
+            content=error_message,
+            tool_name=name,
+            raw_input={"args": tool_call.function.arguments},
+            raw_output=TimeoutError(error_message),
+        ),
+    )
+
+
+def _should_hedge(
+    tools: Union[List[BaseTool], ToolRegistry],
+    name: str,
+    timeout: Optional[float],
+    hedge_delay: Optional[float],
+) -> bool:
+    if hedge_delay is None or (timeout is not None and hedge_delay >= timeout):
+        return False
+    try:
+        return is_idempotent(get_function_by_name(tools, name))
+    except ValueError:
+        return False
+
+
+def call_function_with_deadline(
+    tools: Union[List[BaseTool], ToolRegistry],
+    tool_call: OpenAIToolCall,
+    timeout: Optional[float] = None,
+    hedge_delay: Optional[float] = None,
+    verbose: bool = False,
+    tool_call_parser: Optional[Callable[[OpenAIToolCall], Dict]] = None,
+) -> Tuple[ChatMessage, ToolOutput]:
+    """Call a function, giving up after `timeout` seconds.
+
+    Idempotent tools that have not answered after `hedge_delay` seconds get a
+    second, identical call and the first answer wins. Abandoned calls see
+    `tool_call_cancelled()` return True.
+    """
+    name = tool_call.function.name
+    start_time = time.perf_counter()
+    hedge = _should_hedge(tools, name, timeout, hedge_delay)
+    if timeout is None and not hedge:
+        return call_function(tools, tool_call, verbose=verbose, tool_call_parser=tool_call_parser)
+
+    cancel_event = threading.Event()
+
+    def submit():
+        # each attempt runs in a copy of the caller context, so callback events keep their parent
+        context = contextvars.copy_context()
+        context.run(_tool_cancel_event.set, cancel_event)
+        return _tool_executor.submit(
+            context.run,
+            call_function,
+            tools,
+            tool_call,
+            verbose=verbose,
+            tool_call_parser=tool_call_parser,
+        )
+
+    attempts = [submit()]
+    if hedge:
+        done, _ = wait(attempts, timeout=hedge_delay)
+        if not done:
+            logger.warning(f"Tool {name} has not answered after {hedge_delay:g}s, sending a hedged call.")
+            attempts.append(submit())
+
+    remaining = None if timeout is None else max(timeout - (time.perf_counter() - start_time), 0)
+    done, pending = wait(attempts, timeout=remaining, return_when=FIRST_COMPLETED)
+    for attempt in pending:
+        attempt.cancel()
+    if pending:
+        # attempts that already started cannot be cancelled, they are told to stop
+        cancel_event.set()
+    if done:
+        return next(iter(done)).result()
+
+    logger.warning(
+        f"Tool {name} timed out after {time.perf_counter() - start_time:.1f}s "
+        f"(deadline {timeout:g}s, {len(attempts)} attempt(s))."
+    )
+    return tool_timeout_output(tool_call, timeout)
+
+
+async def acall_function_with_deadline(
+    tools: Union[List[BaseTool], ToolRegistry],
+    tool_call: OpenAIToolCall,
+    timeout: Optional[float] = None,
+    hedge_delay: Optional[float] = None,
+    verbose: bool = False,
+    tool_call_parser: Optional[Callable[[OpenAIToolCall], Dict]] = None,
+) -> Tuple[ChatMessage, ToolOutput]:
+    """Call a function, cancelling it after `timeout` seconds.
+
+    Idempotent tools that have not answered after `hedge_delay` seconds get a
+    second, identical call and the first answer wins. Abandoned calls see
+    `tool_call_cancelled()` return True.
+    """
+    name = tool_call.function.name
+    start_time = time.perf_counter()
+    hedge = _should_hedge(tools, name, timeout, hedge_delay)
+    if timeout is None and not hedge:
+        return await acall_function(tools, tool_call, verbose=verbose, tool_call_parser=tool_call_parser)
+
+    cancel_event = threading.Event()
+
+    def submit():
+        # the task copies the current context, including the cancel event
+        token = _tool_cancel_event.set(cancel_event)
+        try:
+            return asyncio.ensure_future(
+                acall_function(tools, tool_call, verbose=verbose, tool_call_parser=tool_call_parser)
+            )
+        finally:
+            _tool_cancel_event.reset(token)
+
+    attempts = [submit()]
+    if hedge:
+        done, _ = await asyncio.wait(attempts, timeout=hedge_delay)
+        if not done:
+            logger.warning(f"Tool {name} has not answered after {hedge_delay:g}s, sending a hedged call.")
+            attempts.append(submit())
+
+    remaining = None if timeout is None else max(timeout - (time.perf_counter() - start_time), 0)
+    done, pending = await asyncio.wait(attempts, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+    if pending:
+        # a tool blocking the loop only sees the task cancellation at its next await
+        cancel_event.set()
+    for attempt in pending:
+        attempt.cancel()
+    if done:
+        return next(iter(done)).result()
+
+    logger.warning(
+        f"Tool {name} timed out after {time.perf_counter() - start_time:.1f}s "
+        f"(deadline {timeout:g}s, {len(attempts)} attempt(s))."
+    )
+    return tool_timeout_output(tool_call, timeout)
+
+
+class StreamHistoryExecutor:
+    """Bounded thread pool that consumes streamed LLM responses and writes them
+    to the task memory, shared by all workers of the process.
+
+    A writer occupies its thread for the whole stream. When all threads are
+    busy, new streams wait in the queue instead of starting a new thread.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_STREAM_WORKERS):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stream")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._peak_queued = 0
+        # history writes of the async path, referenced until done so they are not garbage collected
+        self._async_writes = set()
+
+    def _run(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+
+    def submit(self, fn: Callable, *args: Any, **kwargs: Any) -> Future:
+        with self._lock:
+            self._queued += 1
+            self._peak_queued = max(self._peak_queued, self._queued)
+        # the writer runs in a copy of the caller context, so callback events keep their parent
+        return self._executor.submit(contextvars.copy_context().run, self._run, fn, *args, **kwargs)
+
+    def create_task(self, coroutine: Any) -> asyncio.Task:
+        """Schedule an async history write on the running event loop."""
+        task = asyncio.create_task(coroutine)
+        self._async_writes.add(task)
+        task.add_done_callback(self._async_writes.discard)
+        return task
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "threads": len(self._executor._threads),
+                "active": self._active,
+                "queue_depth": self._queued,
+                "peak_queue_depth": self._peak_queued,
+                "completed": self._completed,
+                "async_writes": len(self._async_writes),
+            }
+
+
+_stream_executor: Optional[StreamHistoryExecutor] = None
+_stream_executor_lock = threading.Lock()
+
+
+def get_stream_executor(max_workers: int = DEFAULT_STREAM_WORKERS) -> StreamHistoryExecutor:
+    """Process-wide stream history executor, the size of the first caller is kept."""
+    global _stream_executor
+    with _stream_executor_lock:
+        if _stream_executor is None:
+            _stream_executor = StreamHistoryExecutor(max_workers)
+        return _stream_executor
+
+
+def stream_executor_stats() -> Optional[Dict[str, int]]:
+    """Thread count and queue depth of the stream history executor, None before the first worker."""
+    return _stream_executor.stats() if _stream_executor is not None else None
+
+
 class AssistantAgentWorker(BaseAgentWorker):
     """OpenAI Agent agent worker."""
 
@@ -261,10 +596,23 @@ class AssistantAgentWorker(BaseAgentWorker):
         callback_manager: Optional[CallbackManager] = None,
         tool_retriever: Optional[ObjectRetriever[BaseTool]] = None,
         tool_call_parser: Optional[Callable[[OpenAIToolCall], Dict]] = None,
+        max_parallel_tool_calls: int = DEFAULT_MAX_PARALLEL_TOOL_CALLS,
+        tool_timeout: Optional[float] = None,
+        tool_timeouts: Optional[Dict[str, float]] = None,
+        hedge_delay: Optional[float] = None,
+        stream_workers: int = DEFAULT_STREAM_WORKERS,
     ):
         self._llm = llm
         self._verbose = verbose
         self._max_function_calls = max_function_calls
+        self._max_parallel_tool_calls = max_parallel_tool_calls
+        # seconds before a tool call is abandoned, per tool name with `tool_timeout` as default
+        self._tool_timeout = tool_timeout
+        self._tool_timeouts = dict(tool_timeouts or {})
+        self._hedge_delay = hedge_delay
+        self._stream_executor = get_stream_executor(stream_workers)
+        self._tool_cache_lock = threading.Lock()
+        self._tool_registry: Optional[ToolRegistry] = None
         self.prefix_messages = prefix_messages
         self.callback_manager = callback_manager or self._llm.callback_manager
         self.tool_call_parser = tool_call_parser or default_tool_call_parser
@@ -292,6 +640,11 @@ class AssistantAgentWorker(BaseAgentWorker):
         system_prompt: Optional[str] = None,
         prefix_messages: Optional[List[ChatMessage]] = None,
         tool_call_parser: Optional[Callable[[OpenAIToolCall], Dict]] = None,
+        max_parallel_tool_calls: int = DEFAULT_MAX_PARALLEL_TOOL_CALLS,
+        tool_timeout: Optional[float] = None,
+        tool_timeouts: Optional[Dict[str, float]] = None,
+        hedge_delay: Optional[float] = None,
+        stream_workers: int = DEFAULT_STREAM_WORKERS,
         **kwargs: Any,
     ) -> "AssistantAgentWorker":
         """Create an OpenAIAgent from a list of tools.
@@ -333,6 +686,11 @@ class AssistantAgentWorker(BaseAgentWorker):
             max_function_calls=max_function_calls,
             callback_manager=callback_manager,
             tool_call_parser=tool_call_parser,
+            max_parallel_tool_calls=max_parallel_tool_calls,
+            tool_timeout=tool_timeout,
+            tool_timeouts=tool_timeouts,
+            hedge_delay=hedge_delay,
+            stream_workers=stream_workers,
         )
 
     def get_all_messages(self, task: Task) -> List[ChatMessage]:
@@ -379,18 +737,17 @@ class AssistantAgentWorker(BaseAgentWorker):
             chat_stream=self._llm.stream_chat(**llm_chat_kwargs),
             sources=task.extra_state["sources"],
         )
-        # Get the response in a separate thread so we can yield the response
-        thread = Thread(
-            target=chat_stream_response.write_response_to_history,
-            args=(task.extra_state["new_memory"],),
-            kwargs={"on_stream_end_fn": partial(self.finalize_task, task)},
+        # Get the response on the shared stream executor so we can yield the response
+        history_write = self._stream_executor.submit(
+            chat_stream_response.write_response_to_history,
+            task.extra_state["new_memory"],
+            on_stream_end_fn=partial(self.finalize_task, task),
         )
-        thread.start()
         # Wait for the event to be set
         chat_stream_response._is_function_not_none_thread_event.wait()
-        # If it is executing an openAI function, wait for the thread to finish
+        # If it is executing an openAI function, wait for the write to finish
         if chat_stream_response._is_function:
-            thread.join()
+            history_write.result()
 
         # if it's false, return the answer (to stream)
         return chat_stream_response
@@ -403,7 +760,7 @@ class AssistantAgentWorker(BaseAgentWorker):
             sources=task.extra_state["sources"],
         )
         # create task to write chat response to history
-        asyncio.create_task(
+        self._stream_executor.create_task(
             chat_stream_response.awrite_response_to_history(
                 task.extra_state["new_memory"],
                 on_stream_end_fn=partial(self.finalize_task, task),
@@ -439,13 +796,14 @@ class AssistantAgentWorker(BaseAgentWorker):
         else:
             raise NotImplementedError
 
-    def _call_function(
+    def _get_tool_timeout(self, name: str) -> Optional[float]:
+        return self._tool_timeouts.get(name, self._tool_timeout)
+
+    def _run_function(
         self,
-        tools: List[BaseTool],
+        tools: ToolRegistry,
         tool_call: OpenAIToolCall,
-        memory: BaseMemory,
-        sources: List[ToolOutput],
-    ) -> None:
+    ) -> Tuple[ChatMessage, ToolOutput]:
         function_call = tool_call.function
         # validations to get passed mypy
         assert function_call is not None
@@ -461,23 +819,22 @@ class AssistantAgentWorker(BaseAgentWorker):
                 ).metadata,
             },
         ) as event:
-            function_message, tool_output = call_function(
+            function_message, tool_output = call_function_with_deadline(
                 tools,
                 tool_call,
+                timeout=self._get_tool_timeout(function_call.name),
+                hedge_delay=self._hedge_delay,
                 verbose=self._verbose,
                 tool_call_parser=self.tool_call_parser,
             )
             event.on_end(payload={EventPayload.FUNCTION_OUTPUT: str(tool_output)})
-        sources.append(tool_output)
-        memory.put(function_message)
+        return function_message, tool_output
 
-    async def _acall_function(
+    async def _arun_function(
         self,
-        tools: List[BaseTool],
+        tools: ToolRegistry,
         tool_call: OpenAIToolCall,
-        memory: BaseMemory,
-        sources: List[ToolOutput],
-    ) -> None:
+    ) -> Tuple[ChatMessage, ToolOutput]:
         function_call = tool_call.function
         # validations to get passed mypy
         assert function_call is not None
@@ -493,15 +850,154 @@ class AssistantAgentWorker(BaseAgentWorker):
                 ).metadata,
             },
         ) as event:
-            function_message, tool_output = await acall_function(
+            function_message, tool_output = await acall_function_with_deadline(
                 tools,
                 tool_call,
+                timeout=self._get_tool_timeout(function_call.name),
+                hedge_delay=self._hedge_delay,
                 verbose=self._verbose,
                 tool_call_parser=self.tool_call_parser,
             )
             event.on_end(payload={EventPayload.FUNCTION_OUTPUT: str(tool_output)})
-        sources.append(tool_output)
-        memory.put(function_message)
+        return function_message, tool_output
+
+    def _get_tool_cache_key(
+        self, tools: ToolRegistry, tool_call: OpenAIToolCall
+    ) -> Optional[str]:
+        name = tool_call.function.name
+        tool = tools.name_to_tool.get(name)
+        if tool is None or not is_cacheable(tool):
+            return None
+        try:
+            return tool_cache_key(name, self.tool_call_parser(tool_call))
+        except ValueError:
+            return None
+
+    def _get_cached_function(
+        self, tool_call: OpenAIToolCall, cache_key: Optional[str], tool_cache: Optional[Dict]
+    ) -> Optional[Tuple[ChatMessage, ToolOutput]]:
+        if tool_cache is None or cache_key is None:
+            return None
+        with self._tool_cache_lock:
+            tool_output = tool_cache["outputs"].get(cache_key)
+            if tool_output is None:
+                return None
+            tool_cache["hits"] += 1
+        if self._verbose:
+            print(f"=== Reusing output of {tool_call.function.name} with args: {tool_call.function.arguments} ===")
+        # the message answers the new tool call id
+        function_message = ChatMessage(
+            content=str(tool_output),
+            role=MessageRole.TOOL,
+            additional_kwargs={
+                "name": tool_call.function.name,
+                "tool_call_id": tool_call.id,
+            },
+        )
+        return function_message, tool_output
+
+    def _set_cached_function(
+        self, cache_key: Optional[str], tool_output: ToolOutput, tool_cache: Optional[Dict]
+    ) -> None:
+        # failed calls are retried on the next request
+        if tool_cache is None or cache_key is None or isinstance(tool_output.raw_output, Exception):
+            return
+        with self._tool_cache_lock:
+            tool_cache["outputs"][cache_key] = tool_output
+
+    def _call_function(
+        self,
+        tools: ToolRegistry,
+        tool_call: OpenAIToolCall,
+        tool_cache: Optional[Dict] = None,
+    ) -> Tuple[ChatMessage, ToolOutput]:
+        """Call a tool, outputs of cacheable tools are reused from `tool_cache`
+        when the task called the tool with the same arguments before.
+        """
+        cache_key = self._get_tool_cache_key(tools, tool_call) if tool_cache is not None else None
+        cached = self._get_cached_function(tool_call, cache_key, tool_cache)
+        if cached is not None:
+            return cached
+        function_message, tool_output = self._run_function(tools, tool_call)
+        self._set_cached_function(cache_key, tool_output, tool_cache)
+        return function_message, tool_output
+
+    async def _acall_function(
+        self,
+        tools: ToolRegistry,
+        tool_call: OpenAIToolCall,
+        tool_cache: Optional[Dict] = None,
+    ) -> Tuple[ChatMessage, ToolOutput]:
+        """Call a tool, outputs of cacheable tools are reused from `tool_cache`
+        when the task called the tool with the same arguments before.
+        """
+        cache_key = self._get_tool_cache_key(tools, tool_call) if tool_cache is not None else None
+        cached = self._get_cached_function(tool_call, cache_key, tool_cache)
+        if cached is not None:
+            return cached
+        function_message, tool_output = await self._arun_function(tools, tool_call)
+        self._set_cached_function(cache_key, tool_output, tool_cache)
+        return function_message, tool_output
+
+    def _call_functions(
+        self,
+        tools: ToolRegistry,
+        tool_calls: List[OpenAIToolCall],
+        memory: BaseMemory,
+        sources: List[ToolOutput],
+        tool_cache: Optional[Dict] = None,
+    ) -> None:
+        """Run the tool calls of one step in a thread pool of at most
+        `max_parallel_tool_calls` threads, outputs are added in call order.
+        """
+        if len(tool_calls) == 1 or self._max_parallel_tool_calls <= 1:
+            results = [
+                self._call_function(tools, tool_call, tool_cache)
+                for tool_call in tool_calls
+            ]
+        else:
+            with ThreadPoolExecutor(
+                max_workers=min(self._max_parallel_tool_calls, len(tool_calls))
+            ) as executor:
+                # each call runs in a copy of the caller context, so callback events keep their parent
+                futures = [
+                    executor.submit(
+                        contextvars.copy_context().run,
+                        self._call_function,
+                        tools,
+                        tool_call,
+                        tool_cache,
+                    )
+                    for tool_call in tool_calls
+                ]
+                results = [future.result() for future in futures]
+        for function_message, tool_output in results:
+            sources.append(tool_output)
+            memory.put(function_message)
+
+    async def _acall_functions(
+        self,
+        tools: ToolRegistry,
+        tool_calls: List[OpenAIToolCall],
+        memory: BaseMemory,
+        sources: List[ToolOutput],
+        tool_cache: Optional[Dict] = None,
+    ) -> None:
+        """Run the tool calls of one step concurrently, at most
+        `max_parallel_tool_calls` at a time, outputs are added in call order.
+        """
+        semaphore = asyncio.Semaphore(max(self._max_parallel_tool_calls, 1))
+
+        async def call_function(tool_call: OpenAIToolCall) -> Tuple[ChatMessage, ToolOutput]:
+            async with semaphore:
+                return await self._acall_function(tools, tool_call, tool_cache)
+
+        results = await asyncio.gather(
+            *[call_function(tool_call) for tool_call in tool_calls]
+        )
+        for function_message, tool_output in results:
+            sources.append(tool_output)
+            memory.put(function_message)
 
     def initialize_step(self, task: Task, **kwargs: Any) -> TaskStep:
         """Initialize step from task."""
@@ -513,6 +1009,8 @@ class AssistantAgentWorker(BaseAgentWorker):
             "sources": sources,
             "n_function_calls": 0,
             "new_memory": new_memory,
+            # outputs of cacheable tools by tool name and arguments, reused for the rest of the task
+            "tool_cache": {"outputs": {}, "hits": 0},
         }
         task.extra_state.update(task_state)
 
@@ -535,6 +1033,17 @@ class AssistantAgentWorker(BaseAgentWorker):
         """Get tools."""
         return self._get_tools(input)
 
+    def get_tool_registry(self, input: str) -> ToolRegistry:
+        """Registry of the tools for the input, rebuilt only when the tool
+        retriever returns a different tool set.
+        """
+        tools = self.get_tools(input)
+        tool_registry = self._tool_registry
+        if tool_registry is None or not tool_registry.matches(tools):
+            tool_registry = ToolRegistry(tools)
+            self._tool_registry = tool_registry
+        return tool_registry
+
     def _run_step(
         self,
         step: TaskStep,
@@ -548,8 +1057,8 @@ class AssistantAgentWorker(BaseAgentWorker):
                 step, task.extra_state["new_memory"], verbose=self._verbose
             )
         # TODO: see if we want to do step-based inputs
-        tools = self.get_tools(task.input)
-        openai_tools = [tool.metadata.to_openai_tool() for tool in tools]
+        tools = self.get_tool_registry(task.input)
+        openai_tools = list(tools.openai_tools)
 
         llm_chat_kwargs = self._get_llm_chat_kwargs(task, openai_tools, tool_choice)
         agent_chat_response = self._get_agent_response(
@@ -573,18 +1082,19 @@ class AssistantAgentWorker(BaseAgentWorker):
 
                 if tool_call.type != "function":
                     raise ValueError("Invalid tool type. Unsupported by OpenAI")
-                # TODO: maybe execute this with multi-threading
-                self._call_function(
-                    tools,
-                    tool_call,
-                    task.extra_state["new_memory"],
-                    task.extra_state["sources"],
-                )
-                # change function call to the default value, if a custom function was given
-                # as an argument (none and auto are predefined by OpenAI)
-                if tool_choice not in ("auto", "none"):
-                    tool_choice = "auto"
-                task.extra_state["n_function_calls"] += 1
+            # tool calls of the same turn run concurrently, a turn takes as long as its slowest tool
+            self._call_functions(
+                tools,
+                latest_tool_calls,
+                task.extra_state["new_memory"],
+                task.extra_state["sources"],
+                task.extra_state["tool_cache"],
+            )
+            # change function call to the default value, if a custom function was given
+            # as an argument (none and auto are predefined by OpenAI)
+            if tool_choice not in ("auto", "none"):
+                tool_choice = "auto"
+            task.extra_state["n_function_calls"] += len(latest_tool_calls)
             new_steps = [
                 step.get_next_step(
                     step_id=str(uuid.uuid4()),
@@ -594,6 +1104,7 @@ class AssistantAgentWorker(BaseAgentWorker):
             ]
 
         # attach next step to task
+        step.step_state["tool_cache_hits"] = task.extra_state["tool_cache"]["hits"]
 
         return TaskStepOutput(
             output=agent_chat_response,
@@ -616,8 +1127,8 @@ class AssistantAgentWorker(BaseAgentWorker):
             )
 
         # TODO: see if we want to do step-based inputs
-        tools = self.get_tools(task.input)
-        openai_tools = [tool.metadata.to_openai_tool() for tool in tools]
+        tools = self.get_tool_registry(task.input)
+        openai_tools = list(tools.openai_tools)
 
         llm_chat_kwargs = self._get_llm_chat_kwargs(task, openai_tools, tool_choice)
         agent_chat_response = await self._get_async_agent_response(
@@ -640,18 +1151,19 @@ class AssistantAgentWorker(BaseAgentWorker):
 
                 if tool_call.type != "function":
                     raise ValueError("Invalid tool type. Unsupported by OpenAI")
-                # TODO: maybe execute this with multi-threading
-                await self._acall_function(
-                    tools,
-                    tool_call,
-                    task.extra_state["new_memory"],
-                    task.extra_state["sources"],
-                )
-                # change function call to the default value, if a custom function was given
-                # as an argument (none and auto are predefined by OpenAI)
-                if tool_choice not in ("auto", "none"):
-                    tool_choice = "auto"
-                task.extra_state["n_function_calls"] += 1
+            # tool calls of the same turn run concurrently, a turn takes as long as its slowest tool
+            await self._acall_functions(
+                tools,
+                latest_tool_calls,
+                task.extra_state["new_memory"],
+                task.extra_state["sources"],
+                task.extra_state["tool_cache"],
+            )
+            # change function call to the default value, if a custom function was given
+            # as an argument (none and auto are predefined by OpenAI)
+            if tool_choice not in ("auto", "none"):
+                tool_choice = "auto"
+            task.extra_state["n_function_calls"] += len(latest_tool_calls)
 
         # generate next step, append to task queue
         new_steps = (
@@ -665,6 +1177,7 @@ class AssistantAgentWorker(BaseAgentWorker):
             if not is_done
             else []
         )
+        step.step_state["tool_cache_hits"] = task.extra_state["tool_cache"]["hits"]
 
         return TaskStepOutput(
             output=agent_chat_response,
@@ -12,6 +12,65 @@ MODEL_ID = cfg.MODEL.MODEL_ID
 # Embeddings
 EMBEDDING_SERVICE = cfg.MODEL.EMBEDDING_SERVICE
 EMBEDDING_MODEL_NAME = cfg.MODEL.EMBEDDING_MODEL_NAME 
+EMBEDDING_CACHE_DIR = cfg.MODEL.get("EMBEDDING_CACHE_DIR", "./DB/embedding_cache")
+
+# Vector store
+CHROMA_PATH = cfg.MODEL.get("CHROMA_PATH", "./DB/arxiv")
+QDRANT_HOST = cfg.MODEL.get("QDRANT_HOST", "localhost")
+QDRANT_PORT = cfg.MODEL.get("QDRANT_PORT", 6333)
+QDRANT_GRPC_PORT = cfg.MODEL.get("QDRANT_GRPC_PORT", 6334)
+QDRANT_PREFER_GRPC = cfg.MODEL.get("QDRANT_PREFER_GRPC", False)
+QDRANT_PATH = cfg.MODEL.get("QDRANT_PATH")
+WARM_UP_PAPER_SEARCH = cfg.MODEL.get("WARM_UP_PAPER_SEARCH", True)
+VECTOR_QUANTIZATION = cfg.MODEL.get("QUANTIZATION")
+QUANTIZATION_RESCORE = cfg.MODEL.get("QUANTIZATION_RESCORE", True)
+QUANTIZATION_OVERSAMPLING = cfg.MODEL.get("QUANTIZATION_OVERSAMPLING", 2.0)
+PARTITION_BY = cfg.MODEL.get("PARTITION_BY")
+LOCAL_INDEX_DIR = cfg.MODEL.get("LOCAL_INDEX_DIR", "./DB/hnsw")
+HNSW_M = cfg.MODEL.get("HNSW_M", 16)
+HNSW_EF_CONSTRUCTION = cfg.MODEL.get("HNSW_EF_CONSTRUCTION", 200)
+HNSW_EF_SEARCH = cfg.MODEL.get("HNSW_EF_SEARCH", 64)
+METADATA_STORE_DIR = cfg.MODEL.get("METADATA_STORE_DIR", "./DB/paper_metadata")
+
+# Retrieval caches
+QUERY_CACHE_SIZE = cfg.MODEL.get("QUERY_CACHE_SIZE", 1024)
+QUERY_CACHE_TTL = cfg.MODEL.get("QUERY_CACHE_TTL", 3600)
+RESULT_CACHE_SIZE = cfg.MODEL.get("RESULT_CACHE_SIZE", 1024)
+RESULT_CACHE_TTL = cfg.MODEL.get("RESULT_CACHE_TTL", 600)
+
+# Hybrid search
+HYBRID_SEARCH = cfg.MODEL.get("HYBRID_SEARCH", True)
+BM25_INDEX_DIR = cfg.MODEL.get("BM25_INDEX_DIR", "./DB/bm25")
+HYBRID_CANDIDATES = cfg.MODEL.get("HYBRID_CANDIDATES", 20)
+
+# Reranking
+RERANK = cfg.MODEL.get("RERANK", False)
+RERANK_MODEL_NAME = cfg.MODEL.get("RERANK_MODEL_NAME", "mixedbread-ai/mxbai-rerank-xsmall-v1")
+RERANK_CANDIDATES = cfg.MODEL.get("RERANK_CANDIDATES", 50)
+RERANK_TOP_N = cfg.MODEL.get("RERANK_TOP_N", 3)
+RERANK_BATCH_SIZE = cfg.MODEL.get("RERANK_BATCH_SIZE", 16)
+RERANK_CACHE_SIZE = cfg.MODEL.get("RERANK_CACHE_SIZE", 50000)
+RERANK_CACHE_TTL = cfg.MODEL.get("RERANK_CACHE_TTL", 86400)
+
+# Agent
+AGENT_CFG = cfg.get("AGENT") or {}
+MAX_PARALLEL_TOOL_CALLS = AGENT_CFG.get("MAX_PARALLEL_TOOL_CALLS", 4)
+TOOL_TIMEOUT = AGENT_CFG.get("TOOL_TIMEOUT", 60)
+TOOL_TIMEOUTS = dict(AGENT_CFG.get("TOOL_TIMEOUTS") or {})
+TOOL_HEDGE_DELAY = AGENT_CFG.get("TOOL_HEDGE_DELAY")
+STREAM_WORKERS = AGENT_CFG.get("STREAM_WORKERS", 32)
+
+# Ingestion
+INGEST_CFG = cfg.get("INGEST") or {}
+ARXIV_DATA_PATH = INGEST_CFG.get("DATA_PATH", "./data/arxiv-metadata-oai-snapshot.json")
+ARXIV_STAGING_DIR = INGEST_CFG.get("STAGING_DIR", "./data/arxiv_staging")
+ARXIV_CATEGORIES = INGEST_CFG.get("CATEGORIES", ['cs.AI', 'cs.CV', 'cs.IR', 'cs.LG', 'cs.CL'])
+INGEST_BATCH_SIZE = INGEST_CFG.get("BATCH_SIZE", 1024)
+INGEST_MANIFEST_DIR = INGEST_CFG.get("MANIFEST_DIR", "./DB/manifests")
+INGEST_NUM_WORKERS = INGEST_CFG.get("NUM_WORKERS", 0)
+INGEST_DEDUP = INGEST_CFG.get("DEDUP", True)
+INGEST_DEDUP_THRESHOLD = INGEST_CFG.get("DEDUP_THRESHOLD", 0.85)
+INGEST_BM25_SAVE_EVERY = INGEST_CFG.get("BM25_SAVE_EVERY", 10)
 
 DEFAULT_SYSTEM_PROMPT = """
 Bạn là chatbot được phát triển bởi team GenAIO thuộc AIVIETNAM. 
@@ -1,8 +1,14 @@
+import os
+import sys
 from tqdm import tqdm
 from datasets import load_dataset
 import json
 import re
 import pandas as pd
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from constants import ARXIV_DATA_PATH, ARXIV_STAGING_DIR
+from src.utils.arxiv_utils import load_staging_info, iter_parquet_records
 
 
 def search_paper_by_name(name, title_dict):
@@ -199,20 +205,26 @@ def match_numeric_citation(citations):
 
 
 
-def load_and_save_graph_data():
+def load_title_dict():
+    # Only the title and id columns are needed, read them from the Parquet staging files when available
+    if load_staging_info(ARXIV_STAGING_DIR) is not None:
+        return {record['title'].lower(): record['id'] for record in tqdm(iter_parquet_records(ARXIV_STAGING_DIR, columns=['id', 'title']))}
+
     cols = ['id', 'title', 'abstract', 'categories', 'update_date', 'authors']
     data = []
-    file_name = './data/arxiv-metadata-oai-snapshot.json'
-
 
-    with open(file_name, encoding='latin-1') as f:
+    with open(ARXIV_DATA_PATH, encoding='latin-1') as f:
         for line in tqdm(f):
             doc = json.loads(line)
             lst = [doc['id'], doc['title'], doc['abstract'], doc['categories'], doc['update_date'], doc['authors_parsed']]
             data.append(lst)
 
     df_data = pd.DataFrame(data=data, columns=cols)
-    title_dict = {title.lower(): arxiv_id for title, arxiv_id in zip(df_data['title'].tolist(), df_data['id'].to_list())}
+    return {title.lower(): arxiv_id for title, arxiv_id in zip(df_data['title'].tolist(), df_data['id'].to_list())}
+
+
+def load_and_save_graph_data():
+    title_dict = load_title_dict()
     
     parsed_article = load_dataset("BachNgoH/ParsedArxivPapers")['train']
     parsed_article = parsed_article.to_list()
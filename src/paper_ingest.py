@@ -1,102 +1,179 @@
 import os
-import torch
-import chromadb
-import qdrant_client
-import json
 import sys
+import time
+import argparse
 import pandas as pd
-from datetime import datetime
-from llama_index.core import StorageContext, VectorStoreIndex
-from llama_index.vector_stores.chroma import ChromaVectorStore
-from llama_index.vector_stores.qdrant import QdrantVectorStore
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-from llama_index.embeddings.openai import OpenAIEmbedding
-from llama_index.embeddings.ollama import OllamaEmbedding
-from llama_index.core import Document
 from tqdm import tqdm
 sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 # sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
 
-from constants import EMBEDDING_MODEL_NAME, EMBEDDING_SERVICE, cfg
-tqdm.pandas()
-
-device_type = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+from constants import (
+    ARXIV_DATA_PATH, 
+    ARXIV_STAGING_DIR,
+    ARXIV_CATEGORIES, 
+    INGEST_BATCH_SIZE, 
+    INGEST_MANIFEST_DIR,
+    INGEST_NUM_WORKERS,
+    INGEST_DEDUP,
+    INGEST_DEDUP_THRESHOLD,
+    INGEST_BM25_SAVE_EVERY,
+    BM25_INDEX_DIR,
+    METADATA_STORE_DIR,
+    cfg
+)
+from src.utils.arxiv_utils import (
+    iter_arxiv_records, 
+    iter_arxiv_document_batches, 
+    snapshot_checkpoint_name,
+    convert_snapshot_to_parquet,
+    load_staging_info,
+    iter_parquet_records,
+    iter_parquet_document_batches,
+    staging_checkpoint_name
+)
+from src.utils.ingest_manifest import IngestManifest
+from src.utils.dedup_utils import PaperDeduplicator
+from src.utils.bm25_utils import BM25Index
+from src.utils.ingest_utils import (
+    SparseIndexCheckpoint, 
+    documents_to_nodes, 
+    ingest_documents, 
+    ingest_document_batches_parallel
+)
+from src.utils.paper_metadata_store import PaperMetadataStore
+from src.utils.embedding_utils import get_embed_model
+from src.utils.vector_store_utils import (
+    BulkVectorStoreWriter, 
+    PartitionedVectorStore, 
+    QuantizedQdrantVectorStore, 
+    load_paper_vector_store,
+    persist_vector_store
+)
 
 def load_data():
-    
+    """
+    Loads the filtered arXiv snapshot into a DataFrame. Only the papers in `ARXIV_CATEGORIES`
+    are kept in memory, titles and abstracts are cleaned while the snapshot is streamed.
+    Reads the Parquet staging directory instead of the JSON snapshot when it exists.
+    """
     cols = ['id', 'title', 'abstract', 'categories', 'update_date', 'authors']
-    data = []
-    file_name = './data/arxiv-metadata-oai-snapshot.json'
-
-
-    with open(file_name, encoding='latin-1') as f:
-        for line in f:
-            doc = json.loads(line)
-            lst = [doc['id'], doc['title'], doc['abstract'], doc['categories'], doc['update_date'], doc['authors_parsed']]
-            data.append(lst)
-
-    df_data = pd.DataFrame(data=data, columns=cols)
-    
-    topics = ['cs.AI', 'cs.CV', 'cs.IR', 'cs.LG', 'cs.CL']
+    if load_staging_info(ARXIV_STAGING_DIR) is not None:
+        records = iter_parquet_records(ARXIV_STAGING_DIR, columns=cols)
+    else:
+        records = iter_arxiv_records(ARXIV_DATA_PATH, ARXIV_CATEGORIES)
+    df_data = pd.DataFrame.from_records(records, columns=cols)
 
-    # Create a regular expression pattern that matches any of the topics
-    # The pattern will look like 'cs.AI|cs.CV|cs.IR|cs.LG|cs.CL'
-    pattern = '|'.join(topics)
+    df_data['prepared_text'] = df_data['title'] + '\n ' + df_data['abstract']
+    return df_data
 
-    # Filter the DataFrame to include rows where the 'categories' column contains any of the topics
-    # The na=False parameter makes sure that NaN values are treated as False
-    df_data = df_data[df_data['categories'].str.contains(pattern, na=False)]
-    
-    def clean_text(x):
-        
-        # Replace newline characters with a space
-        new_text = " ".join([c.strip() for c in x.replace("\n", "").split()])
-        # Remove leading and trailing spaces
-        new_text = new_text.strip()
-        
-        return new_text
+def iter_document_batches(start_position=0):
+    """Document batches of the Parquet staging directory when it exists, otherwise of the JSON snapshot."""
+    staging_info = load_staging_info(ARXIV_STAGING_DIR)
+    if staging_info is not None:
+        print(f"Reading {staging_info['num_rows']} staged papers from {ARXIV_STAGING_DIR}.")
+        return iter_parquet_document_batches(ARXIV_STAGING_DIR, INGEST_BATCH_SIZE, start_position)
+    return iter_arxiv_document_batches(ARXIV_DATA_PATH, INGEST_BATCH_SIZE, ARXIV_CATEGORIES, start_position)
 
-    df_data['title'] = df_data['title'].progress_apply(clean_text)
-    df_data['abstract'] = df_data['abstract'].progress_apply(clean_text)
+def build_bm25_index():
+    """Rebuilds the BM25 index from scratch with the papers the manifest marks as written."""
+    manifest = IngestManifest.for_collection(INGEST_MANIFEST_DIR, cfg.MODEL.PAPER_COLLECTION_NAME)
+    bm25_index = BM25Index.for_collection(BM25_INDEX_DIR, cfg.MODEL.PAPER_COLLECTION_NAME)
+    for arxiv_documents, _ in tqdm(iter_document_batches(), desc="Indexing batches"):
+        bm25_index.add_documents(manifest.written_documents(arxiv_documents))
+    # A rebuild replaces the saved index instead of merging into it
+    bm25_index.save(merge=False)
+    manifest.close()
+    print(f"BM25 index built with {len(bm25_index)} papers in {bm25_index.index_dir}.")
 
-    df_data['prepared_text'] = df_data['title'] + '\n ' + df_data['abstract']
-    return df_data
+def build_metadata_store():
+    """Rebuilds the paper metadata table from scratch with the papers the manifest marks as written."""
+    manifest = IngestManifest.for_collection(INGEST_MANIFEST_DIR, cfg.MODEL.PAPER_COLLECTION_NAME)
+    metadata_store = PaperMetadataStore.for_collection(METADATA_STORE_DIR, cfg.MODEL.PAPER_COLLECTION_NAME)
+    for path in [metadata_store.rows_path, metadata_store.strings_path]:
+        if os.path.exists(path):
+            os.remove(path)
+    for arxiv_documents, _ in tqdm(iter_document_batches(), desc="Indexing batches"):
+        metadata_store.add_nodes(documents_to_nodes(manifest.written_documents(arxiv_documents)))
+    manifest.close()
+    print(f"Metadata table built with {len(metadata_store)} papers in {metadata_store.store_dir}.")
 
-def ingest_paper():
+def ingest_paper(num_workers=INGEST_NUM_WORKERS):
     
-    df_data = load_data()
+    vector_store = load_paper_vector_store(cfg.MODEL.PAPER_COLLECTION_NAME)
+    stores = vector_store.partition_stores() if isinstance(vector_store, PartitionedVectorStore) else [vector_store]
+    for store in stores:
+        if isinstance(store, QuantizedQdrantVectorStore):
+            store.apply_quantization()
     
-    arxiv_documents = [Document(text=prepared_text, 
-                                metadata={'paper_id': id, 
-                                           'title': title, 
-                                           'date': datetime.strptime(date, "%Y-%m-%d").timestamp()}) 
-                       for _, (id, title, _, _, date, authors, prepared_text) in list(df_data.iterrows())]
-        
-    if EMBEDDING_SERVICE == "ollama":
-        embed_model = OllamaEmbedding(model_name=EMBEDDING_MODEL_NAME)
-    elif EMBEDDING_SERVICE == "hf":
-        embed_model = HuggingFaceEmbedding(model_name=EMBEDDING_MODEL_NAME, cache_folder="./models", device=device_type, embed_batch_size=10)
-    elif EMBEDDING_SERVICE == "openai":
-        embed_model = OpenAIEmbedding(model=EMBEDDING_MODEL_NAME, api_key=os.environ["OPENAI_API_KEY"])
+    # Resume after the last committed batch of this snapshot, unchanged papers are skipped by the manifest
+    manifest = IngestManifest.for_collection(INGEST_MANIFEST_DIR, cfg.MODEL.PAPER_COLLECTION_NAME)
+    deduplicator = None
+    if INGEST_DEDUP:
+        deduplicator = PaperDeduplicator.for_collection(INGEST_MANIFEST_DIR, cfg.MODEL.PAPER_COLLECTION_NAME, threshold=INGEST_DEDUP_THRESHOLD)
+    staging_info = load_staging_info(ARXIV_STAGING_DIR)
+    if staging_info is not None:
+        checkpoint_name = staging_checkpoint_name(ARXIV_STAGING_DIR, staging_info)
     else:
-        raise NotImplementedError()   
-    
-    
-    if cfg.MODEL.VECTOR_STORE == "chroma":
-        client = chromadb.PersistentClient(path="./DB/arxiv")
-        chroma_collection = client.get_or_create_collection(cfg.MODEL.PAPER_COLLECTION_NAME)
+        checkpoint_name = snapshot_checkpoint_name(ARXIV_DATA_PATH)
+    start_position = int(manifest.get_checkpoint(checkpoint_name, 0))
+    if start_position > 0:
+        print(f"Resuming ingestion from position {start_position}.")
 
+    # Stream the papers in batches so peak memory depends on the batch size, not on the corpus size
+    document_batches = iter_document_batches(start_position)
+    # Written papers are also added to the BM25 index used by hybrid search
+    bm25_index = BM25Index.for_collection(BM25_INDEX_DIR, cfg.MODEL.PAPER_COLLECTION_NAME)
+    if bm25_index.exists():
+        bm25_index.load()
+    # saved every few batches, before the manifest checkpoint moves past them
+    sparse_checkpoint = SparseIndexCheckpoint(bm25_index, manifest, save_every=INGEST_BM25_SAVE_EVERY)
+    # and to the metadata table the paper search reads results from
+    metadata_store = None
+    if METADATA_STORE_DIR:
+        metadata_store = PaperMetadataStore.for_collection(METADATA_STORE_DIR, cfg.MODEL.PAPER_COLLECTION_NAME)
+    start_time = time.time()
+    if num_workers > 0:
+        num_embedded = ingest_document_batches_parallel(
+            document_batches, vector_store, num_workers, 
+            manifest=manifest, checkpoint_name=checkpoint_name, deduplicator=deduplicator, sparse_index=sparse_checkpoint,
+            metadata_store=metadata_store
+        )
+    else:
+        embed_model = get_embed_model(embed_batch_size=10)
+        num_embedded = 0
+        # Writes of one batch overlap with embedding of the next one
+        with BulkVectorStoreWriter(vector_store) as writer:
+            for arxiv_documents, offset in tqdm(document_batches, desc="Ingesting batches"):
+                embedded_documents = ingest_documents(
+                    arxiv_documents, vector_store, embed_model, 
+                    manifest=manifest, checkpoint_name=checkpoint_name, checkpoint_value=offset, writer=writer,
+                    deduplicator=deduplicator, sparse_index=sparse_checkpoint, metadata_store=metadata_store
+                )
+                num_embedded += len(embedded_documents)
 
-        # Create vector store
-        vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
-    elif cfg.MODEL.VECTOR_STORE == "qdrant":
-        client = qdrant_client.QdrantClient(host="localhost", port=6333)
-        vector_store = QdrantVectorStore(client=client, collection_name=cfg.MODEL.PAPER_COLLECTION_NAME)
-    
-    storage_context = StorageContext.from_defaults(vector_store=vector_store)
-    VectorStoreIndex.from_documents(
-        arxiv_documents, storage_context=storage_context, embed_model=embed_model, show_progress=True
-    )
+    elapsed = time.time() - start_time
+    print(f"Ingestion finished, embedded {num_embedded} new or changed papers ({num_embedded / max(elapsed, 1e-6):.1f} docs/sec).")
+    persist_vector_store(vector_store)
+    sparse_checkpoint.flush()
+    if deduplicator is not None:
+        print(deduplicator.summary())
+        deduplicator.close()
+    manifest.close()
     
 if __name__ == "__main__":
-    ingest_paper()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-workers", type=int, default=INGEST_NUM_WORKERS, help="Number of embedding processes, 0 embeds in the main process")
+    parser.add_argument("--stage", action="store_true", help="Convert the JSON snapshot to Parquet staging files and exit")
+    parser.add_argument("--build-bm25", action="store_true", help="Rebuild the BM25 index of the ingested papers and exit")
+    parser.add_argument("--build-metadata", action="store_true", help="Rebuild the paper metadata table of the ingested papers and exit")
+    args = parser.parse_args()
+
+    if args.stage:
+        num_rows = convert_snapshot_to_parquet(ARXIV_DATA_PATH, ARXIV_STAGING_DIR, ARXIV_CATEGORIES)
+        print(f"Staged {num_rows} papers to {ARXIV_STAGING_DIR}.")
+    elif args.build_bm25:
+        build_bm25_index()
+    elif args.build_metadata:
+        build_metadata_store()
+    else:
+        ingest_paper(num_workers=args.num_workers)
\ No newline at end of file
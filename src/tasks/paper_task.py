@@ -3,29 +3,21 @@ from datetime import datetime, timedelta
 import time
 import feedparser
 import os
-import torch
-import chromadb
 import sys
-from llama_index.core import StorageContext, VectorStoreIndex
-from llama_index.vector_stores.chroma import ChromaVectorStore
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-from llama_index.embeddings.openai import OpenAIEmbedding
-from llama_index.embeddings.ollama import OllamaEmbedding
 from llama_index.core import Document
 sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
-from constants import EMBEDDING_MODEL_NAME, EMBEDDING_SERVICE
+from constants import cfg, INGEST_MANIFEST_DIR, INGEST_DEDUP, INGEST_DEDUP_THRESHOLD, BM25_INDEX_DIR, METADATA_STORE_DIR
+from src.utils.arxiv_utils import clean_text
+from src.utils.ingest_manifest import IngestManifest
+from src.utils.dedup_utils import PaperDeduplicator, normalize_paper_id
+from src.utils.ingest_utils import ingest_documents
+from src.utils.embedding_utils import get_embed_model
+from src.utils.cache_utils import invalidate
+from src.utils.bm25_utils import get_bm25_index
+from src.utils.paper_metadata_store import get_paper_metadata_store
+from src.utils.vector_store_utils import load_paper_vector_store, persist_vector_store
 from src.tasks.report_task import generate_daily_report
 
-def clean_text(x):
-    
-    # Replace newline characters with a space
-    new_text = " ".join([c.strip() for c in x.replace("\n", "").split()])
-    # Remove leading and trailing spaces
-    new_text = new_text.strip()
-    
-    return new_text
-
-
 def get_daily_arxiv_papers():
     max_results = 800
     categories = ['cs.AI', 'cs.CV', 'cs.IR', 'cs.LG', 'cs.CL']
@@ -51,7 +43,8 @@ def get_daily_arxiv_papers():
                 paper_list.append(Document(text=f"""
 Title: {clean_text(r['title'])}
 {r['summary']}
-                """, metadata={'paper_id': r['id'].split("/")[-1], 'title': clean_text(r['title']), 'date': r['published'][:10]}))
+                """, id_=normalize_paper_id(r['id']), metadata={'paper_id': normalize_paper_id(r['id']), 'title': clean_text(r['title']), 'date': datetime.strptime(r['published'][:10], '%Y-%m-%d').timestamp(), 'categories': ' '.join(tag['term'] for tag in r.get('tags', []))},
+                excluded_embed_metadata_keys=['categories'], excluded_llm_metadata_keys=['categories']))
             else:
                 new_papers_found = False
                 break
@@ -63,29 +56,36 @@ Title: {clean_text(r['title'])}
 
 
 def ingest_paper(arxiv_documents):
-    if EMBEDDING_SERVICE == "ollama":
-        embed_model = OllamaEmbedding(model_name=EMBEDDING_MODEL_NAME)
-    elif EMBEDDING_SERVICE == "hf":
-        device_type=torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        embed_model = HuggingFaceEmbedding(model_name=EMBEDDING_MODEL_NAME, cache_folder="./models", device=device_type, embed_batch_size=64)
-    elif EMBEDDING_SERVICE == "openai":
-        embed_model = OpenAIEmbedding(model=EMBEDDING_MODEL_NAME, api_key=os.environ["OPENAI_API_KEY"])
-    else:
-        raise NotImplementedError()   
+    embed_model = get_embed_model(embed_batch_size=64)
     print("Embed model loaded successfully.")
 
-    chroma_client = chromadb.PersistentClient(path="./DB/arxiv")
-    chroma_collection = chroma_client.get_or_create_collection("gemma_assistant_arxiv_papers")
-
-
-    # Create vector store
-    vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
-    storage_context = StorageContext.from_defaults(vector_store=vector_store)
+    # Shared vector store of the process, partitioned by paper date when `PARTITION_BY` is set
+    vector_store = load_paper_vector_store(cfg.MODEL.PAPER_COLLECTION_NAME)
     
-    VectorStoreIndex.from_documents(
-        arxiv_documents, storage_context=storage_context, embed_model=embed_model, show_progress=True
+    # Only embed papers that are new or changed since the last run
+    manifest = IngestManifest.for_collection(INGEST_MANIFEST_DIR, cfg.MODEL.PAPER_COLLECTION_NAME)
+    # Drop older versions and cross-listed copies of papers that are already indexed
+    deduplicator = None
+    if INGEST_DEDUP:
+        deduplicator = PaperDeduplicator.for_collection(INGEST_MANIFEST_DIR, cfg.MODEL.PAPER_COLLECTION_NAME, threshold=INGEST_DEDUP_THRESHOLD)
+    # The BM25 index is shared with the paper search tool of this process
+    bm25_index = get_bm25_index(BM25_INDEX_DIR, cfg.MODEL.PAPER_COLLECTION_NAME)
+    metadata_store = get_paper_metadata_store(METADATA_STORE_DIR, cfg.MODEL.PAPER_COLLECTION_NAME) if METADATA_STORE_DIR else None
+    embedded_documents = ingest_documents(
+        arxiv_documents, vector_store, embed_model, 
+        manifest=manifest, deduplicator=deduplicator, sparse_index=bm25_index, metadata_store=metadata_store
     )
-    print("Indexing successfully.")
+    if embedded_documents:
+        persist_vector_store(vector_store)
+        bm25_index.save()
+    if deduplicator is not None:
+        print(deduplicator.summary())
+        deduplicator.close()
+    manifest.close()
+    # Cached search results do not contain the new papers yet
+    if embedded_documents:
+        invalidate(cfg.MODEL.PAPER_COLLECTION_NAME)
+    print(f"Indexing successfully, embedded {len(embedded_documents)} new or changed papers.")
     
 def daily_ingest_analyze():
     print("Getting papers.")
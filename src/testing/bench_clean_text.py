@@ -0,0 +1,77 @@
+"""
+Micro-benchmark of the previous `progress_apply(clean_text)` cleaning against the current
+`clean_text`, applied to each record while the snapshot is streamed, on a sample of the arXiv
+snapshot. Both paths build `prepared_text`.
+
+    python src/testing/bench_clean_text.py --num-rows 200000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from itertools import islice
+import pandas as pd
+from tqdm import tqdm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+
+from src.utils.arxiv_utils import clean_text
+
+tqdm.pandas(disable=True)
+
+
+def previous_clean_text(x):
+
+    # Replace newline characters with a space
+    new_text = " ".join([c.strip() for c in x.replace("\n", "").split()])
+    # Remove leading and trailing spaces
+    new_text = new_text.strip()
+
+    return new_text
+
+
+def load_sample(file_name, num_rows):
+    with open(file_name, encoding='latin-1') as f:
+        docs = [json.loads(line) for line in islice(f, num_rows)]
+    return pd.DataFrame({'title': [doc['title'] for doc in docs], 'abstract': [doc['abstract'] for doc in docs]})
+
+
+def apply_path(df_data):
+    title = df_data['title'].progress_apply(previous_clean_text)
+    abstract = df_data['abstract'].progress_apply(previous_clean_text)
+    return title + '\n ' + abstract
+
+
+def streamed_path(df_data):
+    title = [clean_text(x) for x in df_data['title']]
+    abstract = [clean_text(x) for x in df_data['abstract']]
+    return pd.Series([t + '\n ' + a for t, a in zip(title, abstract)], index=df_data.index)
+
+
+def benchmark(fn, df_data, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(df_data)
+        timings.append(time.perf_counter() - start)
+    return result, min(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file-name", default="./data/arxiv-metadata-oai-snapshot.json")
+    parser.add_argument("--num-rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df_data = load_sample(args.file_name, args.num_rows)
+    print(f"Loaded {len(df_data)} rows.")
+
+    expected, apply_time = benchmark(apply_path, df_data, args.repeat)
+    result, current_time = benchmark(streamed_path, df_data, args.repeat)
+
+    assert [text.encode('utf-8') for text in expected] == [text.encode('utf-8') for text in result], \
+        "Current clean_text output differs from the previous clean_text"
+    print(f"progress_apply(clean_text): {apply_time:.3f}s ({len(df_data) / apply_time:.0f} rows/sec)")
+    print(f"clean_text per record:      {current_time:.3f}s ({len(df_data) / current_time:.0f} rows/sec)")
+    print(f"Speedup: {apply_time / current_time:.2f}x, outputs are byte-identical.")
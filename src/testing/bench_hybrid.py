@@ -0,0 +1,72 @@
+"""
+Hit rate and latency of the vector-only `retrieve_paper` against the hybrid BM25 + vector path.
+
+Queries are built from sampled ingested papers: the full title, and the rarest abstract terms which
+stand in for exact method names and acronyms. A hit means the source paper is in the top 5.
+Both result caches are cleared before every call.
+
+    python src/testing/bench_hybrid.py --num-queries 200
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+
+from src.constants import cfg, BM25_INDEX_DIR
+from src.utils.bm25_utils import get_bm25_index, tokenize
+from src.utils.vector_store_utils import load_paper_vector_store, get_paper_nodes
+from src.tools.paper_search_tool import load_paper_search_tool, paper_result_cache, query_embedding_cache
+
+
+def build_queries(bm25_index, vector_store, num_queries, num_keywords):
+    paper_ids = random.Random(0).sample(bm25_index.paper_ids, min(num_queries, len(bm25_index.paper_ids)))
+    nodes = get_paper_nodes(vector_store, paper_ids)
+
+    queries = {"title": [], "keywords": []}
+    for node in nodes:
+        paper_id, title = node.metadata["paper_id"], node.metadata["title"]
+        queries["title"].append((paper_id, title))
+
+        # Terms that occur in the fewest papers
+        terms = sorted(set(tokenize(node.get_content())) - set(tokenize(title)), key=bm25_index.document_frequency)
+        if terms:
+            queries["keywords"].append((paper_id, " ".join(terms[:num_keywords])))
+    return queries
+
+
+def run(retrieve_paper, queries):
+    hits, timings = [], []
+    for paper_id, query_str in queries:
+        paper_result_cache.clear()
+        query_embedding_cache.clear()
+        start = time.perf_counter()
+        result = retrieve_paper(query_str)
+        timings.append(time.perf_counter() - start)
+        hits.append(any(paper["paper_id"] == paper_id for paper in result))
+    return np.mean(hits), np.array(timings) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--num-keywords", type=int, default=3)
+    args = parser.parse_args()
+
+    bm25_index = get_bm25_index(BM25_INDEX_DIR, cfg.MODEL.PAPER_COLLECTION_NAME)
+    if len(bm25_index) == 0:
+        sys.exit(f"No BM25 index in {BM25_INDEX_DIR}, run `python src/paper_ingest.py --build-bm25` first.")
+
+    queries = build_queries(bm25_index, load_paper_vector_store(), args.num_queries, args.num_keywords)
+    tools = {
+        "vector": load_paper_search_tool(hybrid_search=False).fn,
+        "hybrid": load_paper_search_tool(hybrid_search=True).fn,
+    }
+
+    print(f"{'query type':<12}{'mode':<8}{'hit@5':>8}{'p50 ms':>10}{'p95 ms':>10}")
+    for query_type, query_list in queries.items():
+        for mode, retrieve_paper in tools.items():
+            hit_rate, timings = run(retrieve_paper, query_list)
+            print(f"{query_type:<12}{mode:<8}{hit_rate:>8.3f}{np.percentile(timings, 50):>10.1f}{np.percentile(timings, 95):>10.1f}")
@@ -0,0 +1,124 @@
+"""
+Latency, recall and memory of the in-process HNSW store (`VECTOR_STORE: local`) against Chroma.
+
+Each store is built from the same vectors, then re-opened and queried in a fresh process, so the
+reported RSS growth covers loading the index and serving the queries, not building it. Queries go
+through the llama-index `query` of each store, like `retrieve_paper`, without and with a one-year
+date filter. Vectors come from the embedding cache or are generated, see bench_quantization.py.
+
+    python src/testing/bench_local_ann.py --num-vectors 100000
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import multiprocessing
+from datetime import datetime
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores.types import VectorStoreQuery, MetadataFilters, MetadataFilter, FilterOperator
+
+from src.testing.bench_quantization import load_vectors, exact_top_k
+from src.utils.vector_store_utils import chunk_list, persist_vector_store, write_nodes
+
+START_DATE = datetime(2020, 1, 1).timestamp()
+END_DATE = datetime(2025, 1, 1).timestamp()
+FILTER_START, FILTER_END = datetime(2023, 1, 1).timestamp(), datetime(2023, 12, 31).timestamp()
+
+
+def open_store(backend, path):
+    if backend == "chroma":
+        import chromadb
+        from llama_index.vector_stores.chroma import ChromaVectorStore
+        collection = chromadb.PersistentClient(path=path).get_or_create_collection("bench")
+        return ChromaVectorStore(chroma_collection=collection)
+
+    from src.utils.local_vector_store import LocalHNSWVectorStore
+    return LocalHNSWVectorStore(persist_dir=path)
+
+
+def build_store(backend, path, vectors, dates):
+    store = open_store(backend, path)
+    for ids in chunk_list(list(range(len(vectors))), 4096):
+        write_nodes(store, [
+            TextNode(id_=str(i), text=f"paper {i}", embedding=vectors[i].tolist(), metadata={"paper_id": str(i), "date": float(dates[i])})
+            for i in ids
+        ])
+    persist_vector_store(store)
+
+
+def query_store(backend, path, queries, top_k, results):
+    start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    store = open_store(backend, path)
+    date_filters = MetadataFilters(filters=[
+        MetadataFilter(key="date", value=FILTER_START, operator=FilterOperator.GTE),
+        MetadataFilter(key="date", value=FILTER_END, operator=FilterOperator.LTE),
+    ])
+
+    output = {}
+    for mode, filters in [("all", None), ("one year", date_filters)]:
+        ids, timings = [], []
+        for query in queries:
+            start = time.perf_counter()
+            result = store.query(VectorStoreQuery(query_embedding=query.tolist(), similarity_top_k=top_k, filters=filters))
+            timings.append(time.perf_counter() - start)
+            ids.append([int(node.metadata["paper_id"]) for node in result.nodes])
+        output[mode] = (ids, np.array(timings) * 1000)
+    # ru_maxrss is in KB on Linux
+    output["rss_mb"] = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - start_rss) / 1024
+    results.update(output)
+
+
+def run_in_process(target, *args):
+    with multiprocessing.Manager() as manager:
+        results = manager.dict()
+        process = multiprocessing.Process(target=target, args=(*args, results))
+        process.start()
+        process.join()
+        return dict(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-vectors", type=int, default=100_000)
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--backends", nargs="+", default=["local", "chroma"])
+    args = parser.parse_args()
+
+    vectors = load_vectors(args.num_vectors + args.num_queries, args.dim)
+    # Unit vectors, so the L2 ranking of Chroma is the cosine ranking
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors, queries = vectors[:-args.num_queries], vectors[-args.num_queries:]
+    dates = np.random.default_rng(0).uniform(START_DATE, END_DATE, len(vectors))
+    in_range = np.flatnonzero((dates >= FILTER_START) & (dates <= FILTER_END))
+    ground_truth = {
+        "all": exact_top_k(vectors, queries, args.top_k),
+        "one year": in_range[exact_top_k(vectors[in_range], queries, args.top_k)],
+    }
+
+    print(f"{'backend':<10}{'filter':<10}{'recall@' + str(args.top_k):>10}{'p50 ms':>10}{'p99 ms':>10}{'build s':>10}{'RSS MB':>10}{'disk MB':>10}")
+    for backend in args.backends:
+        path = tempfile.mkdtemp(prefix=f"bench_{backend}_")
+        try:
+            start = time.perf_counter()
+            process = multiprocessing.Process(target=build_store, args=(backend, path, vectors, dates))
+            process.start()
+            process.join()
+            build_seconds = time.perf_counter() - start
+            disk_mb = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names) / 2**20
+
+            results = run_in_process(query_store, backend, path, queries, args.top_k)
+            for mode in ["all", "one year"]:
+                ids, timings = results[mode]
+                recall = np.mean([len(set(result) & set(truth.tolist())) / args.top_k for result, truth in zip(ids, ground_truth[mode])])
+                print(f"{backend:<10}{mode:<10}{recall:>10.3f}{np.percentile(timings, 50):>10.2f}{np.percentile(timings, 99):>10.2f}"
+                      f"{build_seconds:>10.1f}{results['rss_mb']:>10.1f}{disk_mb:>10.1f}")
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,109 @@
+"""
+Recall versus latency of quantized Qdrant collections against the float32 collection.
+
+Vectors are read from the float32 file of the embedding cache (or generated when it is missing),
+held-out vectors are used as queries and the exact cosine top-k is the ground truth.
+
+    python src/testing/bench_quantization.py --url http://localhost:6333 --num-vectors 200000
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import qdrant_client
+from qdrant_client.http import models as rest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+
+from src.constants import EMBEDDING_CACHE_DIR, EMBEDDING_MODEL_NAME
+from src.utils.embedding_utils import EmbeddingCache
+from src.utils.vector_store_utils import chunk_list, quantization_config
+
+CONFIGS = [
+    ("float32", None, False),
+    ("int8", "int8", False),
+    ("int8+rescore", "int8", True),
+    ("binary", "binary", False),
+    ("binary+rescore", "binary", True),
+]
+
+
+def load_vectors(num_vectors, dim):
+    if EMBEDDING_CACHE_DIR:
+        cache = EmbeddingCache(EMBEDDING_CACHE_DIR, EMBEDDING_MODEL_NAME)
+        if cache.dim is not None:
+            vectors = np.fromfile(cache.vectors_path, dtype=np.float32).reshape(-1, cache.dim)[:num_vectors]
+            print(f"Loaded {len(vectors)} vectors from {cache.vectors_path}.")
+            return vectors
+
+    print("Embedding cache is empty, using random clustered vectors.")
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(256, dim))
+    vectors = centers[rng.integers(0, len(centers), num_vectors)] + 0.5 * rng.normal(size=(num_vectors, dim))
+    return vectors.astype(np.float32)
+
+
+def exact_top_k(vectors, queries, top_k):
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    return np.argsort(-(queries @ vectors.T), axis=1)[:, :top_k]
+
+
+def create_collection(client, name, vectors, quantization):
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    client.create_collection(
+        collection_name=name,
+        vectors_config=rest.VectorParams(size=vectors.shape[1], distance=rest.Distance.COSINE, on_disk=quantization is not None),
+        quantization_config=quantization_config(quantization) if quantization else None,
+    )
+    for ids in chunk_list(list(range(len(vectors))), 4096):
+        client.upsert(name, points=rest.Batch(ids=ids, vectors=vectors[ids[0]:ids[-1] + 1].tolist()), wait=True)
+
+    # Wait until the HNSW index and the quantized vectors are built
+    while client.get_collection(name).status != rest.CollectionStatus.GREEN:
+        time.sleep(1)
+
+
+def run_queries(client, name, queries, top_k, rescore, oversampling):
+    search_params = rest.SearchParams(
+        quantization=rest.QuantizationSearchParams(rescore=rescore, oversampling=oversampling)
+    )
+    results, timings = [], []
+    for query in queries:
+        start = time.perf_counter()
+        response = client.search(name, query_vector=query.tolist(), limit=top_k, search_params=search_params, with_payload=False)
+        timings.append(time.perf_counter() - start)
+        results.append([point.id for point in response])
+    return results, np.array(timings) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:6333", help="Qdrant server, `:memory:` runs the local mode without quantization")
+    parser.add_argument("--num-vectors", type=int, default=100_000)
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--oversampling", type=float, default=2.0)
+    args = parser.parse_args()
+
+    client = qdrant_client.QdrantClient(location=args.url)
+    vectors = load_vectors(args.num_vectors + args.num_queries, args.dim)
+    vectors, queries = vectors[:-args.num_queries], vectors[-args.num_queries:]
+    ground_truth = exact_top_k(vectors, queries, args.top_k)
+
+    print(f"{'config':<16}{'recall@' + str(args.top_k):>10}{'p50 ms':>10}{'p95 ms':>10}{'RAM bytes/vec':>15}")
+    for name, quantization, rescore in CONFIGS:
+        collection_name = f"bench_quantization_{quantization or 'float32'}"
+        if not rescore:
+            create_collection(client, collection_name, vectors, quantization)
+
+        results, timings = run_queries(client, collection_name, queries, args.top_k, rescore, args.oversampling)
+        recall = np.mean([len(set(result) & set(truth.tolist())) / args.top_k for result, truth in zip(results, ground_truth)])
+        dim = vectors.shape[1]
+        bytes_per_vector = {None: 4 * dim, "int8": dim, "binary": dim // 8}[quantization]
+        print(f"{name:<16}{recall:>10.3f}{np.percentile(timings, 50):>10.2f}{np.percentile(timings, 95):>10.2f}{bytes_per_vector:>15}")
+
+        if rescore or quantization is None:
+            client.delete_collection(collection_name)
@@ -0,0 +1,64 @@
+"""
+Latency overhead and prompt size of cross-encoder reranking in `retrieve_paper`.
+
+Uses the title and rare-keyword queries of bench_hybrid.py. Each configuration is run cold (all
+caches cleared) and warm (the query was run before and only the result cache is cleared, so the
+reranking is served from the score cache). A hit means the source paper is among the returned
+papers, the prompt size is the returned paper content in characters.
+
+    python src/testing/bench_rerank.py --num-queries 100
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+
+from src.constants import cfg, BM25_INDEX_DIR
+from src.testing.bench_hybrid import build_queries
+from src.utils.bm25_utils import get_bm25_index
+from src.utils.rerank_utils import get_reranker, rerank_score_cache
+from src.utils.vector_store_utils import load_paper_vector_store
+from src.tools.paper_search_tool import load_paper_search_tool, paper_result_cache, query_embedding_cache
+
+
+def run(retrieve_paper, queries, rerank, warm):
+    hits, timings, prompt_chars = [], [], []
+    for paper_id, query_str in queries:
+        if warm:
+            retrieve_paper(query_str, rerank=rerank)
+        else:
+            query_embedding_cache.clear()
+            rerank_score_cache.clear()
+        paper_result_cache.clear()
+        start = time.perf_counter()
+        result = retrieve_paper(query_str, rerank=rerank)
+        timings.append(time.perf_counter() - start)
+        hits.append(any(paper["paper_id"] == paper_id for paper in result))
+        prompt_chars.append(sum(len(paper["paper_content"]) for paper in result))
+    return np.mean(hits), np.array(timings) * 1000, np.mean(prompt_chars)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-queries", type=int, default=100)
+    parser.add_argument("--num-keywords", type=int, default=3)
+    args = parser.parse_args()
+
+    bm25_index = get_bm25_index(BM25_INDEX_DIR, cfg.MODEL.PAPER_COLLECTION_NAME)
+    if len(bm25_index) == 0:
+        sys.exit(f"No BM25 index in {BM25_INDEX_DIR}, run `python src/paper_ingest.py --build-bm25` first.")
+
+    queries = build_queries(bm25_index, load_paper_vector_store(), args.num_queries, args.num_keywords)
+    retrieve_paper = load_paper_search_tool().fn
+    # Load the cross-encoder before timing
+    get_reranker()
+
+    print(f"{'query type':<12}{'rerank':<8}{'cache':<6}{'hit':>8}{'p50 ms':>10}{'p95 ms':>10}{'prompt chars':>14}")
+    for query_type, query_list in queries.items():
+        for rerank in [False, True]:
+            for warm in [False, True]:
+                hit_rate, timings, prompt_chars = run(retrieve_paper, query_list, rerank, warm)
+                print(f"{query_type:<12}{str(rerank):<8}{'warm' if warm else 'cold':<6}{hit_rate:>8.3f}"
+                      f"{np.percentile(timings, 50):>10.1f}{np.percentile(timings, 95):>10.1f}{prompt_chars:>14.0f}")
@@ -0,0 +1,96 @@
+"""
+Micro-benchmark of the per-step tool overhead of `AssistantAgentWorker`: the previous path derived
+the OpenAI schemas of all tools and built the name map twice per tool call on every step, the
+`ToolRegistry` path checks the tool set and reuses the precompiled schemas and name map.
+
+The tools have the signatures of the assistant tools, their bodies are not called.
+
+    python src/testing/bench_tool_registry.py --num-steps 2000 --tool-calls 2
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+from typing import List
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+
+from llama_index.core.llms import MockLLM
+from llama_index.core.tools import FunctionTool, adapt_to_async_tool
+
+from src.agents.assistant_step import AssistantAgentWorker, get_function_by_name
+
+
+def retrieve_paper(query_str: str, start_date: str = None, end_date: str = None, rerank: bool = False):
+    """Useful for answering questions about papers, research. Add paper year if needed."""
+
+
+def retrieve_papers_batch(queries: List[str], start_date: str = None, end_date: str = None, rerank: bool = False):
+    """Useful for searching papers for several questions or sub-questions at once."""
+
+
+def summarize(arxiv_id: str = None, paper_title: str = None):
+    """Summarize the paper with the given arXiv ID or paper title."""
+
+
+def get_latest_arxiv_papers():
+    """Useful for getting latest daily papers"""
+
+
+def get_current_time():
+    """Returns the current time in the format: "YYYY-MM-DD HH:MM:SS"."""
+
+
+def search_web(query_str: str):
+    """Search the internet for information on a given query"""
+
+
+def previous_step(tools, tool_names):
+    openai_tools = [tool.metadata.to_openai_tool() for tool in tools]
+    for name in tool_names:
+        # once for the callback event and once in `acall_function`
+        get_function_by_name(tools, name)
+        adapt_to_async_tool(get_function_by_name(tools, name))
+    return openai_tools
+
+
+def registry_step(worker, tool_names):
+    tool_registry = worker.get_tool_registry("")
+    openai_tools = list(tool_registry.openai_tools)
+    for name in tool_names:
+        tool_registry.get_tool(name)
+        tool_registry.get_async_tool(name)
+    return openai_tools
+
+
+def time_steps(step_fn, num_steps):
+    timings = []
+    for _ in range(num_steps):
+        start = time.perf_counter()
+        step_fn()
+        timings.append(time.perf_counter() - start)
+    return np.array(timings) * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-steps", type=int, default=2000)
+    parser.add_argument("--tool-calls", type=int, default=2, help="tool calls per step")
+    args = parser.parse_args()
+
+    tools = [
+        FunctionTool.from_defaults(fn)
+        for fn in [retrieve_paper, retrieve_papers_batch, summarize, get_latest_arxiv_papers, get_current_time, search_web]
+    ]
+    tool_names = [tools[i % len(tools)].metadata.name for i in range(args.tool_calls)]
+    # The LLM is not called, only the tool handling of a step is timed
+    worker = AssistantAgentWorker(tools=tools, llm=MockLLM(), prefix_messages=[])
+    assert previous_step(tools, tool_names) == registry_step(worker, tool_names)
+
+    print(f"{'path':<10}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}")
+    for path, step_fn in [
+        ("previous", lambda: previous_step(tools, tool_names)),
+        ("registry", lambda: registry_step(worker, tool_names)),
+    ]:
+        timings = time_steps(step_fn, args.num_steps)
+        print(f"{path:<10}{timings.mean():>10.1f}{np.percentile(timings, 50):>10.1f}{np.percentile(timings, 99):>10.1f}")
@@ -0,0 +1,69 @@
+"""
+Tests of the BM25 index used by hybrid paper search.
+
+    python -m pytest -q src/testing/test_bm25_index.py
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+
+from llama_index.core import Document
+
+from src.utils.bm25_utils import BM25Index, tokenize
+
+
+def make_documents(paper_ids, text="retrieval augmented generation"):
+    return [Document(text=f"{text} {paper_id}", metadata={"paper_id": paper_id, "date": 1.0}) for paper_id in paper_ids]
+
+
+def test_save_keeps_papers_of_another_writer(tmp_path):
+    index_dir = str(tmp_path / "bm25")
+    initial = BM25Index(index_dir)
+    initial.add_documents(make_documents([f"init{i}" for i in range(5)]))
+    initial.save()
+
+    # The API loads the index at startup, the bulk ingest script saves papers after that
+    api_index = BM25Index(index_dir).load()
+    bulk_index = BM25Index(index_dir).load()
+    bulk_index.add_documents(make_documents([f"bulk{i}" for i in range(5)]))
+    bulk_index.save()
+
+    api_index.add_documents(make_documents(["daily0", "daily1"]))
+    api_index.save()
+
+    reloaded = BM25Index(index_dir).load()
+    assert len(reloaded) == 12
+    assert {"bulk0", "daily1", "init4"} <= {paper_id for paper_id, _ in reloaded.search("retrieval", top_k=20)}
+    # The saving instance also serves the papers of the other writer
+    assert len(api_index) == 12
+
+
+def test_merge_replaces_papers_added_by_both_writers(tmp_path):
+    index_dir = str(tmp_path / "bm25")
+    first, second = BM25Index(index_dir), BM25Index(index_dir)
+    first.add_documents(make_documents(["shared", "first"], text="diffusion models"))
+    first.save()
+    second.add_documents(make_documents(["shared"], text="graph neural networks"))
+    second.save()
+
+    reloaded = BM25Index(index_dir).load()
+    assert len(reloaded) == 2
+    assert [paper_id for paper_id, _ in reloaded.search("graph")] == ["shared"]
+    assert [paper_id for paper_id, _ in reloaded.search("diffusion")] == ["first"]
+
+
+def test_rebuild_overwrites_saved_index(tmp_path):
+    index_dir = str(tmp_path / "bm25")
+    stale = BM25Index(index_dir)
+    stale.add_documents(make_documents(["removed"]))
+    stale.save()
+
+    rebuilt = BM25Index(index_dir)
+    rebuilt.add_documents(make_documents(["kept"]))
+    rebuilt.save(merge=False)
+    assert BM25Index(index_dir).load().paper_ids == ["kept"]
+
+
+def test_tokenize_drops_number_and_single_character_parts():
+    assert tokenize("GPT-4 and LLaMA-2-70B") == ["gpt-4", "gpt", "llama-2-70b", "llama", "70b"]
+    assert tokenize("arXiv 2401.01234 uses x-ray") == ["arxiv", "2401.01234", "uses", "x-ray", "ray"]
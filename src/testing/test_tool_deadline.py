@@ -0,0 +1,79 @@
+"""
+Tests of the tool call deadlines of the agent loop.
+
+    python -m pytest -q src/testing/test_tool_deadline.py
+"""
+import os
+import sys
+import time
+import asyncio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+
+from llama_index.core.tools import FunctionTool
+from openai.types.chat.chat_completion_message_tool_call import ChatCompletionMessageToolCall, Function
+
+from src.agents.assistant_step import (
+    ToolRegistry,
+    acall_function_with_deadline,
+    call_function_with_deadline,
+    is_sync_tool,
+    tool_call_cancelled,
+)
+
+
+def make_streaming_tool(tokens):
+    """Sync tool that streams tokens until the agent gives up on the call, like `summarize`."""
+
+    def stream(query_str: str):
+        """Streams an answer."""
+        for i in range(50):
+            if tool_call_cancelled():
+                tokens.append("cancelled")
+                return "cancelled"
+            tokens.append(i)
+            time.sleep(0.02)
+        return "done"
+
+    return FunctionTool.from_defaults(stream)
+
+
+def make_tool_call(name):
+    return ChatCompletionMessageToolCall(id="call_0", type="function", function=Function(name=name, arguments='{"query_str": "llm"}'))
+
+
+def test_sync_tool_stops_after_deadline():
+    tokens = []
+    tools = ToolRegistry([make_streaming_tool(tokens)])
+    message, _ = call_function_with_deadline(tools, make_tool_call("stream"), timeout=0.2)
+    time.sleep(0.2)
+
+    assert "did not respond within 0.2 seconds" in message.content
+    assert tokens[-1] == "cancelled"
+    assert len(tokens) < 50
+
+
+def test_async_path_cancels_sync_tool():
+    tokens = []
+    tool = make_streaming_tool(tokens)
+    assert is_sync_tool(tool)
+
+    async def run():
+        message, _ = await acall_function_with_deadline(ToolRegistry([tool]), make_tool_call("stream"), timeout=0.2)
+        # The event loop stays free while the tool runs in the tool executor
+        await asyncio.sleep(0.2)
+        return message
+
+    message = asyncio.run(run())
+    assert "did not respond within 0.2 seconds" in message.content
+    assert tokens[-1] == "cancelled"
+    assert len(tokens) < 50
+
+
+def test_async_path_returns_output_before_deadline():
+    tokens = []
+    tools = ToolRegistry([make_streaming_tool(tokens)])
+    message, output = asyncio.run(acall_function_with_deadline(tools, make_tool_call("stream"), timeout=5))
+
+    assert message.content == "done"
+    assert output.raw_output == "done"
+    assert not tool_call_cancelled()
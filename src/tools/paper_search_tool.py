@@ -1,24 +1,43 @@
 import os
-import torch
-import chromadb
-import qdrant_client
-from llama_index.core import VectorStoreIndex
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-from llama_index.vector_stores.chroma import ChromaVectorStore
-from llama_index.vector_stores.qdrant import QdrantVectorStore
-from llama_index.core import StorageContext
+from typing import List
 from llama_index.core.schema import MetadataMode
-from llama_index.embeddings.openai import OpenAIEmbedding
-from llama_index.embeddings.ollama import OllamaEmbedding
 from llama_index.core.tools import FunctionTool
 from llama_index.core.vector_stores import (
     FilterOperator, 
     FilterCondition, 
     MetadataFilter, 
-    MetadataFilters
+    MetadataFilters,
+    VectorStoreQuery
 )
 
-from src.constants import EMBEDDING_MODEL_NAME, EMBEDDING_SERVICE, cfg
+from src.constants import (
+    cfg, 
+    QUERY_CACHE_SIZE, 
+    QUERY_CACHE_TTL, 
+    RESULT_CACHE_SIZE, 
+    RESULT_CACHE_TTL,
+    HYBRID_SEARCH,
+    BM25_INDEX_DIR,
+    HYBRID_CANDIDATES,
+    RERANK,
+    RERANK_CANDIDATES,
+    RERANK_TOP_N,
+    METADATA_STORE_DIR,
+    WARM_UP_PAPER_SEARCH
+)
+from src.utils.bm25_utils import get_bm25_index, reciprocal_rank_fusion
+from src.utils.cache_utils import TTLCache, register_invalidation
+from src.utils.embedding_utils import get_embed_model, embed_queries, normalize_text
+from src.utils.rerank_utils import get_reranker
+from src.utils.paper_metadata_store import get_paper_metadata_store, paper_node_id
+from src.utils.vector_store_utils import (
+    load_paper_vector_store, 
+    paper_collection_exists, 
+    get_nodes_by_ids, 
+    get_paper_nodes, 
+    query_batch, 
+    warm_up_vector_store
+)
 from datetime import datetime
 import time
 from pyvis.network import Network
@@ -29,105 +48,243 @@ Paper link: {paper_link}
 Paper: {paper_content}
 """
 
-def load_paper_search_tool():
-    device_type = torch.device("cuda" if torch.cuda.is_available() else "cpu") 
-    if EMBEDDING_SERVICE == "ollama":
-        embed_model = OllamaEmbedding(model_name=EMBEDDING_MODEL_NAME)
-    elif EMBEDDING_SERVICE == "hf":
-        embed_model = HuggingFaceEmbedding(model_name=EMBEDDING_MODEL_NAME, cache_folder="./models", device=device_type, embed_batch_size=64)
-    elif EMBEDDING_SERVICE == "openai":
-        embed_model = OpenAIEmbedding(model=EMBEDDING_MODEL_NAME, api_key=os.environ["OPENAI_API_KEY"])
-    else:
-        raise NotImplementedError()   
-
-    if cfg.MODEL.VECTOR_STORE == "chroma":
-        client = chromadb.PersistentClient(path="./DB/arxiv")
-        chroma_collection = client.get_or_create_collection(cfg.MODEL.PAPER_COLLECTION_NAME)
-        # Create vector store
-        vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
-    elif cfg.MODEL.VECTOR_STORE == "qdrant":
-        client = qdrant_client.QdrantClient(host="localhost", port=6333)
-        vector_store = QdrantVectorStore(client=client, collection_name=cfg.MODEL.PAPER_COLLECTION_NAME)
-    
+# Shared by every session of the process, popular questions are embedded once
+query_embedding_cache = TTLCache(max_size=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL)
+# Final retrieve_paper results, cleared when new papers are written to the paper collection
+paper_result_cache = TTLCache(max_size=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL)
+register_invalidation(cfg.MODEL.PAPER_COLLECTION_NAME, paper_result_cache.clear)
+
+
+def get_query_embedding(embed_model, query_str):
+    """Embeds a search query, repeated queries are served from `query_embedding_cache`."""
+    return get_query_embeddings(embed_model, [query_str])[0]
+
+
+def get_query_embeddings(embed_model, query_strs):
+    """Embeds search queries in one batch, only the queries missing from `query_embedding_cache` are encoded."""
+    if not QUERY_CACHE_SIZE:
+        return embed_queries(embed_model, query_strs)
+
+    keys = [normalize_text(query_str) for query_str in query_strs]
+    embeddings = [query_embedding_cache.get(key) for key in keys]
+    miss_idx = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if miss_idx:
+        for i, embedding in zip(miss_idx, embed_queries(embed_model, [query_strs[i] for i in miss_idx])):
+            embeddings[i] = embedding
+            query_embedding_cache.set(keys[i], embedding)
+    return embeddings
+
+
+def load_paper_retriever(hybrid_search=HYBRID_SEARCH):
+    """
+    Builds `retrieve_papers_batch`, which answers several queries with one batched embedding call
+    and one multi-query vector search. `retrieve_paper` is the single-query case of it.
+    """
+    embed_model = get_embed_model(embed_batch_size=64)
+    vector_store = load_paper_vector_store(cfg.MODEL.PAPER_COLLECTION_NAME)
     
-    # load the vectorstore
-    storage_context = StorageContext.from_defaults(vector_store=vector_store)
-    paper_index = VectorStoreIndex.from_vector_store(vector_store, storage_context=storage_context, embed_model=embed_model)
+    # BM25 results are fused with the vector results, exact method names and acronyms match lexically
+    bm25_index = None
+    if hybrid_search:
+        bm25_index = get_bm25_index(BM25_INDEX_DIR, cfg.MODEL.PAPER_COLLECTION_NAME)
+        if len(bm25_index) == 0:
+            print(f"No BM25 index found in {BM25_INDEX_DIR}, paper search is vector-only until papers are ingested.")
+    # Compact table of the returned fields, filled by the ingest or with `python src/paper_ingest.py --build-metadata`
+    metadata_store = get_paper_metadata_store(METADATA_STORE_DIR, cfg.MODEL.PAPER_COLLECTION_NAME) if METADATA_STORE_DIR else None
     
     # node_postporcessor = PaperYearNodePostprocessor()
     
     # graph = load_graph_data()
     graph = None
+    similarity_top_k = 5
     
-    def retrieve_paper(query_str: str, start_date: str = None, end_date: str = None):
-        
+    def retrieve_papers_batch(queries: List[str], start_date: str = None, end_date: str = None, rerank: bool = RERANK):
         """
-        Useful for answering questions about papers, research. Add paper year if needed.  
-        Retrieves papers based on the given query string and optional year.
+        Useful for searching papers for several questions or sub-questions at once. Add paper year if needed.
+        Retrieves papers for each of the given query strings and optional date range.
 
         Args:
-            query_str (str): The query string used to search for papers.
+            queries (List[str]): The query strings used to search for papers.
             start_date (str, optional): The start range of retrieve papers. Defaults to "None".
             end_date (str, optional): The end range of retrieve papers. Defaults to today.
+            rerank (bool, optional): Re-score more candidates with a cross-encoder and keep the best few, slower but more precise.
             
         Returns:
-            list: A list of retrieved papers, each containing the paper link and content.
+            list: One list of retrieved papers per query, each paper containing the paper link and content.
         """
         
+        use_hybrid = bm25_index is not None and len(bm25_index) > 0
+        # With reranking, more candidates are retrieved and the cross-encoder keeps the best RERANK_TOP_N
+        num_results = RERANK_CANDIDATES if rerank else similarity_top_k
+        num_candidates = RERANK_CANDIDATES if rerank else HYBRID_CANDIDATES if use_hybrid else similarity_top_k
+        results = [None] * len(queries)
+        # Hybrid and vector-only results of the same query are cached apart
+        cache_keys = [(normalize_text(query_str), start_date, end_date, similarity_top_k, use_hybrid, rerank) for query_str in queries]
+        if RESULT_CACHE_SIZE:
+            for i, cache_key in enumerate(cache_keys):
+                cached_result = paper_result_cache.get(cache_key)
+                if cached_result is not None:
+                    results[i] = [dict(paper) for paper in cached_result]
+        miss_idx = [i for i, result in enumerate(results) if result is None]
+        if not miss_idx:
+            return results
+
         filters = MetadataFilters(filters=[])
+        start_timestamp = datetime.strptime(start_date, "%Y-%m-%d").timestamp() if start_date is not None else None
+        end_timestamp = datetime.strptime(end_date, "%Y-%m-%d").timestamp() if end_date is not None else None
 
         if start_date is not None:
             filters.filters.append(
                 MetadataFilter(
                     key="date", 
                     operator=FilterOperator.GTE, 
-                    value=datetime.strptime(start_date, "%Y-%m-%d").timestamp()))
+                    value=start_timestamp))
             
         if end_date is not None:
             filters.filters.append(
                 MetadataFilter(
                     key="date", 
                     operator=FilterOperator.LTE, 
-                    value=datetime.strptime(end_date, "%Y-%m-%d").timestamp()))
+                    value=end_timestamp))
 
+        query_embeddings = get_query_embeddings(embed_model, [queries[i] for i in miss_idx])
+        # With the metadata table, the vector store only returns ids and scores (Qdrant also paper_id,
+        # title and date) and the text comes from the table. When more candidates are searched than
+        # returned, only the nodes of the returned papers are fetched afterwards
+        use_metadata_store = metadata_store is not None and len(metadata_store) > 0
+        with_nodes = num_candidates == num_results
+        vector_results = query_batch(vector_store, [
+            VectorStoreQuery(
+                query_embedding=query_embedding,
+                similarity_top_k=num_candidates,
+                filters=filters
+            )
+            for query_embedding in query_embeddings
+        ], with_nodes=with_nodes, metadata_store=metadata_store if use_metadata_store else None)
+        ranked_ids = [list(vector_result.ids or [])[:num_results] for vector_result in vector_results]
+        found_nodes = {node.node_id: node for vector_result in vector_results for node in vector_result.nodes or []}
 
-        paper_retriever = paper_index.as_retriever(
-            similarity_top_k=5,
-            filters=filters
-        )
-        
-        
-        retriever_response = paper_retriever.retrieve(query_str)
-        retriever_result = []
-        for n in retriever_response:
-            paper_id = n.metadata["paper_id"]
-            paper_title = n.metadata["title"]
-            paper_content = n.node.get_content(metadata_mode=MetadataMode.LLM)
-            paper_link = f"https://arxiv.org/abs/{paper_id}"
+        sparse_paper_ids = {}
+        if use_hybrid:
+            for j, i in enumerate(miss_idx):
+                sparse_ids = []
+                for paper_id, _ in bm25_index.search(queries[i], num_candidates, start_timestamp, end_timestamp):
+                    sparse_ids.append(paper_node_id(paper_id))
+                    sparse_paper_ids[sparse_ids[-1]] = paper_id
+                ranked_ids[j] = reciprocal_rank_fusion([list(vector_results[j].ids or []), sparse_ids])[:num_results]
+
+        # Nodes of the final ids are gathered with one lookup for all queries
+        missing_ids = list(dict.fromkeys(node_id for query_ids in ranked_ids for node_id in query_ids if node_id not in found_nodes))
+        if missing_ids and use_metadata_store:
+            found_nodes.update({node.node_id: node for node in metadata_store.get_nodes(missing_ids) if node is not None})
+            missing_ids = [node_id for node_id in missing_ids if node_id not in found_nodes]
+        if missing_ids:
+            found_nodes.update({node.node_id: node for node in get_nodes_by_ids(vector_store, missing_ids)})
+        # Papers found only by BM25 whose node id is not derived from the paper id
+        missing_papers = [sparse_paper_ids[node_id] for node_id in missing_ids if node_id not in found_nodes and node_id in sparse_paper_ids]
+        if missing_papers:
+            found_nodes.update({paper_node_id(node.metadata["paper_id"]): node for node in get_paper_nodes(vector_store, missing_papers)})
+        all_retriever_nodes = [[found_nodes[node_id] for node_id in query_ids if node_id in found_nodes] for query_ids in ranked_ids]
+
+        for i, retriever_nodes in zip(miss_idx, all_retriever_nodes):
+            if rerank:
+                retriever_nodes = get_reranker().rerank(queries[i], retriever_nodes, RERANK_TOP_N)
+            retriever_result = []
+            for node in retriever_nodes:
+                paper_id = node.metadata["paper_id"]
+                paper_title = node.metadata["title"]
+                paper_content = node.get_content(metadata_mode=MetadataMode.LLM)
+                paper_link = f"https://arxiv.org/abs/{paper_id}"
+                
+                retriever_result.append({
+                    'link': paper_link,
+                    'paper_id': paper_id,
+                    'title': paper_title,
+                    'paper_content': paper_content
+                })
             
-            retriever_result.append({
-                'link': paper_link,
-                'paper_id': paper_id,
-                'title': paper_title,
-                'paper_content': paper_content
-            })
+            # combined_ego_graph = create_ego_graph(retriever_response, service="ss", graph=graph)
+            # nt = Network(notebook=True)#, font_color='#10000000')
+            # nt.from_nx(combined_ego_graph)
+            # for node in nt.nodes:
+            #     node['value'] = combined_ego_graph.nodes[node['id']]['size']
+
+            # nt.save_graph("./outputs/nx_graph.html")
             
-        # combined_ego_graph = create_ego_graph(retriever_response, service="ss", graph=graph)
-        # nt = Network(notebook=True)#, font_color='#10000000')
-        # nt.from_nx(combined_ego_graph)
-        # for node in nt.nodes:
-        #     node['value'] = combined_ego_graph.nodes[node['id']]['size']
+            if RESULT_CACHE_SIZE:
+                paper_result_cache.set(cache_keys[i], [dict(paper) for paper in retriever_result])
+            results[i] = retriever_result
+        return results
 
-        # nt.save_graph("./outputs/nx_graph.html")
+    return retrieve_papers_batch
+
+
+def warm_up_paper_search(hybrid_search=HYBRID_SEARCH):
+    """
+    Opens the shared embed model, vector store, BM25 index and metadata table of the paper search
+    and runs one search through them, so the first user query after a deploy does not pay for
+    loading the model and faulting in the index pages. The warm-up query bypasses the caches.
+    """
+    if not WARM_UP_PAPER_SEARCH:
+        return
+    if not paper_collection_exists(cfg.MODEL.PAPER_COLLECTION_NAME):
+        # Opening the store would create an empty collection
+        print(f"Paper search warm-up skipped, collection {cfg.MODEL.PAPER_COLLECTION_NAME} does not exist yet.")
+        return
+
+    start_time = time.time()
+    embed_model = get_embed_model(embed_batch_size=64)
+    vector_store = load_paper_vector_store(cfg.MODEL.PAPER_COLLECTION_NAME)
+    query_str = "large language model"
+    node_ids = warm_up_vector_store(vector_store, embed_queries(embed_model, [query_str])[0])
+
+    metadata_store = get_paper_metadata_store(METADATA_STORE_DIR, cfg.MODEL.PAPER_COLLECTION_NAME) if METADATA_STORE_DIR else None
+    if metadata_store is not None and len(metadata_store) > 0:
+        metadata_store.get_nodes(node_ids)
+    else:
+        get_nodes_by_ids(vector_store, node_ids)
+    if hybrid_search:
+        get_bm25_index(BM25_INDEX_DIR, cfg.MODEL.PAPER_COLLECTION_NAME).search(query_str)
+    print(f"Paper search warmed up in {time.time() - start_time:.2f}s.")
+
+
+def load_paper_search_tool(hybrid_search=HYBRID_SEARCH):
+    retrieve_papers_batch = load_paper_retriever(hybrid_search)
+    
+    def retrieve_paper(query_str: str, start_date: str = None, end_date: str = None, rerank: bool = RERANK):
         
-        return retriever_result
+        """
+        Useful for answering questions about papers, research. Add paper year if needed.  
+        Retrieves papers based on the given query string and optional year.
+
+        Args:
+            query_str (str): The query string used to search for papers.
+            start_date (str, optional): The start range of retrieve papers. Defaults to "None".
+            end_date (str, optional): The end range of retrieve papers. Defaults to today.
+            rerank (bool, optional): Re-score more candidates with a cross-encoder and keep the best few, slower but more precise.
+            
+        Returns:
+            list: A list of retrieved papers, each containing the paper link and content.
+        """
+        return retrieve_papers_batch([query_str], start_date, end_date, rerank)[0]
             
         
     # paper_search_tool = QueryEngineTool.from_defaults(
     #     query_engine=paper_query_engine,
     #     description="Useful for answering questions related to scientific papers",
     # )
-    return FunctionTool.from_defaults(retrieve_paper)
+    paper_search_tool = FunctionTool.from_defaults(retrieve_paper)
+    # Repeated searches of a chat task reuse the first result and slow searches may be hedged, see AssistantAgentWorker
+    paper_search_tool.cacheable = True
+    paper_search_tool.idempotent = True
+    return paper_search_tool
+
+
+def load_paper_batch_search_tool(hybrid_search=HYBRID_SEARCH):
+    paper_batch_search_tool = FunctionTool.from_defaults(load_paper_retriever(hybrid_search))
+    paper_batch_search_tool.cacheable = True
+    paper_batch_search_tool.idempotent = True
+    return paper_batch_search_tool
 
 
 def load_daily_paper_tool():
@@ -156,7 +313,10 @@ def load_daily_paper_tool():
         return {"content":  
             f"Report Link: https://github.com/BachNgoH/DailyAIReports/blob/main/daily_reports/{latest_file.split('/')[-1]}\n{md_content}"}
             
-    return FunctionTool.from_defaults(get_latest_arxiv_papers, description="Useful for getting latest daily papers")
+    daily_paper_tool = FunctionTool.from_defaults(get_latest_arxiv_papers, description="Useful for getting latest daily papers")
+    daily_paper_tool.cacheable = True
+    daily_paper_tool.idempotent = True
+    return daily_paper_tool
 
 
 def load_get_time_tool():
@@ -167,4 +327,6 @@ def load_get_time_tool():
         """
         return {"content": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
     
-    return FunctionTool.from_defaults(get_current_time)
\ No newline at end of file
+    get_time_tool = FunctionTool.from_defaults(get_current_time)
+    get_time_tool.idempotent = True
+    return get_time_tool
\ No newline at end of file
@@ -1,4 +1,5 @@
 import os
+import asyncio
 from datetime import datetime
 from llama_index.core.tools import FunctionTool
 from llama_index.llms.gemini import Gemini
@@ -7,6 +8,7 @@ import chainlit as cl
 import time
 from chainlit import run_sync
 
+from src.agents.assistant_step import tool_call_cancelled
 from src.utils.load_papers_utils import download_paper, extract_text_from_document
 from src.prompts.summarize_prompt import SUMMARIZE_PROMPT_TEMPLATE
 
@@ -41,6 +43,10 @@ def load_summarize_tool():
 
                     response = summarize_llm.stream_complete(prompt)
                     for token in response:
+                        # The agent answers without this summary once the call missed its deadline
+                        if tool_call_cancelled():
+                            run_sync(msg.remove())
+                            return {"content": "Summarize cancelled."}
                         run_sync(msg.stream_token(str(token)))
                     
                     run_sync(msg.send())
@@ -82,8 +88,16 @@ def load_summarize_tool():
                     msg = cl.Message(content="", author="Assistant")
 
                     response = summarize_llm.stream_complete(prompt)
-                    for token in response:
-                        await msg.stream_token(token)
+                    try:
+                        for token in response:
+                            if tool_call_cancelled():
+                                await msg.remove()
+                                return "Summarize cancelled."
+                            await msg.stream_token(token)
+                    except asyncio.CancelledError:
+                        # The agent answers without this summary once the call missed its deadline
+                        await msg.remove()
+                        raise
                     
                     await msg.send()
                 else:
@@ -98,4 +112,5 @@ def load_summarize_tool():
         else:
             return f"Cannot find paper with id {arxiv_id}."
     
-    return FunctionTool.from_defaults(summarize, async_fn=asummarize)
\ No newline at end of file
+    summarize_tool = FunctionTool.from_defaults(summarize, async_fn=asummarize)
+    return summarize_tool
\ No newline at end of file
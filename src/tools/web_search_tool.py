@@ -82,4 +82,7 @@ def load_web_search_tool():
 
         return [res.metadata for res in web_search_results]
             
-    return FunctionTool.from_defaults(search_web, description="Function to search the web, avoid using this tool if other tools can do the job")
\ No newline at end of file
+    web_search_tool = FunctionTool.from_defaults(search_web, description="Function to search the web, avoid using this tool if other tools can do the job")
+    web_search_tool.cacheable = True
+    web_search_tool.idempotent = True
+    return web_search_tool
\ No newline at end of file
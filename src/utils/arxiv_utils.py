@@ -0,0 +1,209 @@
+import os
+import json
+import shutil
+from datetime import datetime
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from llama_index.core import Document
+
+from src.utils.dedup_utils import normalize_paper_id
+
+
+DEFAULT_CATEGORIES = ['cs.AI', 'cs.CV', 'cs.IR', 'cs.LG', 'cs.CL']
+
+
+def clean_text(x):
+    # Drop newline characters and collapse the remaining whitespace to single spaces.
+    # Tokens from `split()` carry no surrounding whitespace, so no extra strip is needed.
+    return " ".join(x.replace("\n", "").split())
+
+
+def iter_arxiv_records(file_name, categories=DEFAULT_CATEGORIES, start_offset=0):
+    """
+    Streams the arXiv metadata snapshot line by line, keeping only papers in the given categories.
+
+    Args:
+        file_name (str): Path to the `arxiv-metadata-oai-snapshot.json` file.
+        categories (list, optional): arXiv categories to keep.
+        start_offset (int, optional): Byte offset to resume reading from.
+
+    Yields:
+        dict: A record with `id`, `title`, `abstract`, `categories`, `update_date` and `authors`,
+            with title and abstract already cleaned, and the byte `offset` right after the record.
+    """
+    categories = set(categories)
+
+    with open(file_name, 'rb') as f:
+        f.seek(start_offset)
+        offset = start_offset
+        for line in f:
+            offset += len(line)
+            doc = json.loads(line.decode('latin-1'))
+            if categories.isdisjoint(doc['categories'].split()):
+                continue
+
+            yield {
+                'id': doc['id'],
+                'title': clean_text(doc['title']),
+                'abstract': clean_text(doc['abstract']),
+                'categories': doc['categories'],
+                'update_date': doc['update_date'],
+                'authors': doc['authors_parsed'],
+                'offset': offset,
+            }
+
+
+def record_to_document(record):
+    paper_id = normalize_paper_id(record['id'])
+    return Document(
+        id_=paper_id,
+        text=record['title'] + '\n ' + record['abstract'],
+        metadata={
+            'paper_id': paper_id,
+            'title': record['title'],
+            'date': datetime.strptime(record['update_date'], "%Y-%m-%d").timestamp(),
+            'categories': record.get('categories', '')
+        },
+        # Only kept for the paper metadata table, not embedded nor shown to the LLM
+        excluded_embed_metadata_keys=['categories'],
+        excluded_llm_metadata_keys=['categories'])
+
+
+def iter_arxiv_document_batches(file_name, batch_size=1024, categories=DEFAULT_CATEGORIES, start_offset=0):
+    """
+    Groups the filtered snapshot records into batches of `Document`s, so memory usage
+    depends on `batch_size` rather than on the size of the snapshot.
+
+    Yields:
+        tuple: (list of `Document`, byte offset to resume from once the batch is ingested)
+    """
+    batch = []
+    for record in iter_arxiv_records(file_name, categories, start_offset):
+        batch.append(record_to_document(record))
+        if len(batch) == batch_size:
+            yield batch, record['offset']
+            batch = []
+
+    if batch:
+        yield batch, record['offset']
+
+
+def snapshot_checkpoint_name(file_name):
+    """Checkpoint key tied to the snapshot file, so a new snapshot restarts from the beginning."""
+    stat = os.stat(file_name)
+    return f"snapshot:{os.path.abspath(file_name)}:{stat.st_size}:{int(stat.st_mtime)}"
+
+
+
+STAGING_INFO_FILE = "_staging_info.json"
+
+STAGING_SCHEMA = pa.schema([
+    ('id', pa.string()),
+    ('title', pa.string()),
+    ('abstract', pa.string()),
+    ('categories', pa.string()),
+    ('update_date', pa.string()),
+    ('date', pa.float64()),
+    ('authors', pa.list_(pa.list_(pa.string()))),
+    ('year', pa.int32()),
+])
+
+
+def convert_snapshot_to_parquet(file_name, staging_dir, categories=DEFAULT_CATEGORIES, chunk_size=100_000):
+    """
+    One-time conversion of the JSON snapshot into year-partitioned Parquet files holding the
+    filtered papers with cleaned title and abstract, so later runs can read only the columns they need.
+
+    Args:
+        file_name (str): Path to the `arxiv-metadata-oai-snapshot.json` file.
+        staging_dir (str): Output directory, written as `year=YYYY/*.parquet`.
+        categories (list, optional): arXiv categories to keep.
+        chunk_size (int, optional): Number of records buffered per written row group.
+
+    Returns:
+        int: Number of staged papers.
+    """
+    # Start from an empty directory so files of a previous snapshot are not mixed in
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir, exist_ok=True)
+    num_rows = 0
+    chunk = []
+
+    def flush():
+        table = pa.Table.from_pylist(chunk, schema=STAGING_SCHEMA)
+        pq.write_to_dataset(table, staging_dir, partition_cols=['year'],
+                            basename_template=f"part-{num_rows:09d}-{{i}}.parquet")
+
+    for record in iter_arxiv_records(file_name, categories):
+        record.pop('offset')
+        record['date'] = datetime.strptime(record['update_date'], "%Y-%m-%d").timestamp()
+        record['year'] = int(record['update_date'][:4])
+        chunk.append(record)
+        if len(chunk) == chunk_size:
+            flush()
+            num_rows += len(chunk)
+            chunk = []
+
+    if chunk:
+        flush()
+        num_rows += len(chunk)
+
+    # Written last, its presence marks a complete staging directory
+    with open(os.path.join(staging_dir, STAGING_INFO_FILE), 'w') as f:
+        json.dump({'source': snapshot_checkpoint_name(file_name), 'num_rows': num_rows, 'categories': list(categories)}, f)
+    return num_rows
+
+
+def load_staging_info(staging_dir):
+    info_path = os.path.join(staging_dir, STAGING_INFO_FILE)
+    if not os.path.isfile(info_path):
+        return None
+    with open(info_path) as f:
+        return json.load(f)
+
+
+def load_staged_dataset(staging_dir):
+    return ds.dataset(staging_dir, format="parquet", partitioning="hive")
+
+
+def iter_parquet_records(staging_dir, columns=None, batch_size=8192, start_row=0):
+    """
+    Lazily reads the staged papers, decoding only the requested columns.
+
+    Yields:
+        dict: One record per paper with the requested columns.
+    """
+    row = 0
+    for record_batch in load_staged_dataset(staging_dir).to_batches(columns=columns, batch_size=batch_size):
+        if row + record_batch.num_rows <= start_row:
+            row += record_batch.num_rows
+            continue
+        records = record_batch.to_pylist()
+        yield from records[max(0, start_row - row):]
+        row += record_batch.num_rows
+
+
+def iter_parquet_document_batches(staging_dir, batch_size=1024, start_row=0):
+    """
+    Same as `iter_arxiv_document_batches` but reads the staged Parquet files.
+
+    Yields:
+        tuple: (list of `Document`, number of staged rows consumed once the batch is ingested)
+    """
+    columns = ['id', 'title', 'abstract', 'update_date', 'categories']
+    batch = []
+    row = start_row
+    for record in iter_parquet_records(staging_dir, columns=columns, start_row=start_row):
+        batch.append(record_to_document(record))
+        row += 1
+        if len(batch) == batch_size:
+            yield batch, row
+            batch = []
+
+    if batch:
+        yield batch, row
+
+
+def staging_checkpoint_name(staging_dir, staging_info):
+    return f"staging:{os.path.abspath(staging_dir)}:{staging_info['source']}"
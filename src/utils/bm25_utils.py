@@ -0,0 +1,300 @@
+import os
+import re
+import json
+import fcntl
+import threading
+from collections import Counter
+
+import numpy as np
+
+
+_TOKEN_PATTERN = re.compile(r"\w+(?:[-.]\w+)*")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in into is it its of on or that the their this to was were which with we our
+""".split())
+
+
+def tokenize(text):
+    """
+    Lower-cased word tokens. Compound tokens such as `gpt-4`, `llama-2-70b` or `2401.01234` are kept
+    whole next to their parts, so exact model names and acronyms match. Parts that are numbers or a
+    single character (the `4` of `gpt-4`) are dropped, they would match unrelated papers.
+    """
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if "-" in token or "." in token:
+            tokens.extend(
+                part for part in re.split(r"[-.]", token)
+                if len(part) > 1 and not part.isdigit() and part not in STOPWORDS
+            )
+    return tokens
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Fuses ranked id lists, each id scores `sum(1 / (k + rank))` over the lists it appears in."""
+    scores = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class BM25Index:
+    """
+    In-process BM25 index over paper title and abstract.
+
+    The saved index is a CSR posting matrix (term -> papers, term frequencies) in a versioned
+    `postings-<n>.npz`, plus the vocabulary, paper ids and the name of the matching postings file in
+    `meta.json`. Papers added after loading are kept as unsorted
+    (term, paper, frequency) arrays that are searched together with the saved postings and merged
+    on `save`. Re-adding a paper replaces its previous entry. A `date` timestamp is kept per paper
+    for the date filters.
+
+    `save` holds an exclusive lock on `index.lock`. When another process saved since this index was
+    loaded, the papers added here are merged into the saved version instead of overwriting it, so the
+    bulk ingest script and the daily task of the API can both add papers.
+    """
+
+    def __init__(self, index_dir, k1=1.2, b=0.75):
+        self.index_dir = index_dir
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+
+        self.paper_ids = []
+        self._paper_rows = {}
+        self._vocab = {}
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._doc_rows = np.zeros(0, dtype=np.int32)
+        self._term_freqs = np.zeros(0, dtype=np.uint16)
+        self._doc_lens = np.zeros(0, dtype=np.int32)
+        self._dates = np.zeros(0, dtype=np.float64)
+        self._deleted = np.zeros(0, dtype=bool)
+        self._pending = []
+        self._pending_sorted = None
+        # Papers added since the last load or save, re-added when merging into a newer saved version
+        self._unsaved = []
+        self._postings = None
+
+    @classmethod
+    def for_collection(cls, index_dir, collection_name):
+        return cls(os.path.join(index_dir, collection_name))
+
+    def exists(self):
+        return os.path.exists(os.path.join(self.index_dir, "meta.json"))
+
+    def load(self):
+        with self._lock:
+            with open(os.path.join(self.index_dir, "meta.json")) as f:
+                meta = json.load(f)
+            # Indexes saved before the postings were versioned use a fixed name
+            arrays = np.load(os.path.join(self.index_dir, meta.get("postings", "postings.npz")))
+            self.paper_ids = meta["paper_ids"]
+            self._paper_rows = {paper_id: row for row, paper_id in enumerate(self.paper_ids)}
+            self._vocab = {term: i for i, term in enumerate(meta["vocab"])}
+            self._indptr = arrays["indptr"]
+            self._doc_rows = arrays["doc_rows"]
+            self._term_freqs = arrays["term_freqs"]
+            self._doc_lens = arrays["doc_lens"]
+            self._dates = arrays["dates"]
+            self._deleted = arrays["deleted"]
+            self._pending = []
+            self._pending_sorted = None
+            self._unsaved = []
+            self._postings = meta.get("postings", "postings.npz")
+        return self
+
+    def __len__(self):
+        return len(self.paper_ids) - int(self._deleted.sum())
+
+    def add_documents(self, documents):
+        """Indexes paper `Document`s with `paper_id` and `date` metadata."""
+        entries = []
+        for doc in documents:
+            tokens = tokenize(doc.text)
+            date = doc.metadata.get('date')
+            entries.append((doc.metadata['paper_id'], Counter(tokens), len(tokens), date if isinstance(date, (int, float)) else np.nan))
+        with self._lock:
+            self._unsaved.extend(entries)
+            self._add_entries(entries)
+
+    def _add_entries(self, entries):
+        term_ids, rows, tfs, doc_lens, dates, replaced_rows = [], [], [], [], [], []
+        for paper_id, term_counts, doc_len, date in entries:
+            row = len(self.paper_ids)
+            if paper_id in self._paper_rows:
+                replaced_rows.append(self._paper_rows[paper_id])
+            self._paper_rows[paper_id] = row
+            self.paper_ids.append(paper_id)
+
+            for token, tf in term_counts.items():
+                term_ids.append(self._vocab.setdefault(token, len(self._vocab)))
+                rows.append(row)
+                tfs.append(min(tf, 65535))
+            doc_lens.append(doc_len)
+            dates.append(date)
+
+        self._pending.append((
+            np.asarray(term_ids, dtype=np.int32), np.asarray(rows, dtype=np.int32), np.asarray(tfs, dtype=np.uint16)
+        ))
+        self._pending_sorted = None
+        self._doc_lens = np.concatenate([self._doc_lens, np.asarray(doc_lens, dtype=np.int32)])
+        self._dates = np.concatenate([self._dates, np.asarray(dates, dtype=np.float64)])
+        self._deleted = np.concatenate([self._deleted, np.zeros(len(doc_lens), dtype=bool)])
+        self._deleted[replaced_rows] = True
+
+    def _sorted_pending(self):
+        if self._pending_sorted is None:
+            term_ids = np.concatenate([p[0] for p in self._pending]) if self._pending else np.zeros(0, dtype=np.int32)
+            rows = np.concatenate([p[1] for p in self._pending]) if self._pending else np.zeros(0, dtype=np.int32)
+            tfs = np.concatenate([p[2] for p in self._pending]) if self._pending else np.zeros(0, dtype=np.uint16)
+            order = np.argsort(term_ids, kind="stable")
+            self._pending_sorted = (term_ids[order], rows[order], tfs[order])
+        return self._pending_sorted
+
+    def _term_postings(self, term):
+        term_id = self._vocab.get(term)
+        if term_id is None:
+            return None, None
+
+        rows, tfs = [], []
+        if term_id < len(self._indptr) - 1:
+            start, end = self._indptr[term_id], self._indptr[term_id + 1]
+            rows.append(self._doc_rows[start:end])
+            tfs.append(self._term_freqs[start:end])
+        if self._pending:
+            pending_terms, pending_rows, pending_tfs = self._sorted_pending()
+            start, end = np.searchsorted(pending_terms, [term_id, term_id + 1])
+            rows.append(pending_rows[start:end])
+            tfs.append(pending_tfs[start:end])
+        return np.concatenate(rows), np.concatenate(tfs).astype(np.float32)
+
+    def document_frequency(self, term):
+        with self._lock:
+            rows, _ = self._term_postings(term)
+            return 0 if rows is None else int((~self._deleted[rows]).sum())
+
+    def search(self, query_str, top_k=10, start_date=None, end_date=None):
+        """
+        Returns:
+            list: (paper_id, score) tuples of the best `top_k` papers, dates are filtered on the
+                `date` timestamp like the vector search.
+        """
+        with self._lock:
+            num_docs = len(self.paper_ids)
+            if num_docs == 0:
+                return []
+
+            active = ~self._deleted
+            avg_len = max(float(self._doc_lens[active].mean()) if active.any() else 1.0, 1.0)
+            scores = np.zeros(num_docs, dtype=np.float32)
+            for term in set(tokenize(query_str)):
+                rows, tfs = self._term_postings(term)
+                if rows is None or len(rows) == 0:
+                    continue
+                df = int(active[rows].sum())
+                idf = np.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * self._doc_lens[rows] / avg_len)
+                # Each paper appears once per term, so plain fancy-index assignment is safe
+                scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+            mask = active & (scores > 0)
+            if start_date is not None:
+                mask &= self._dates >= start_date
+            if end_date is not None:
+                mask &= self._dates <= end_date
+            candidates = np.flatnonzero(mask)
+            if len(candidates) > top_k:
+                candidates = candidates[np.argpartition(-scores[candidates], top_k)[:top_k]]
+            candidates = candidates[np.argsort(-scores[candidates])]
+            return [(self.paper_ids[row], float(scores[row])) for row in candidates]
+
+    def save(self, merge=True):
+        """
+        Merges the added papers into the postings and writes the index to disk. With `merge`, papers
+        another process saved since this index was loaded are kept, otherwise they are overwritten.
+        """
+        with self._lock:
+            os.makedirs(self.index_dir, exist_ok=True)
+            with open(os.path.join(self.index_dir, "index.lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    if merge and self.exists() and self._postings_name() != self._postings:
+                        self._rebase()
+                    self._write()
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _rebase(self):
+        # Re-adds the papers added here on top of the version another process saved
+        unsaved = self._unsaved
+        self.load()
+        self._add_entries(unsaved)
+
+    def _write(self):
+        if self._pending:
+            pending_terms, pending_rows, pending_tfs = self._sorted_pending()
+            base_terms = np.repeat(np.arange(len(self._indptr) - 1, dtype=np.int32), np.diff(self._indptr))
+            term_ids = np.concatenate([base_terms, pending_terms])
+            order = np.argsort(term_ids, kind="stable")
+            self._doc_rows = np.concatenate([self._doc_rows, pending_rows])[order]
+            self._term_freqs = np.concatenate([self._term_freqs, pending_tfs])[order]
+            self._indptr = np.zeros(len(self._vocab) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(term_ids, minlength=len(self._vocab)), out=self._indptr[1:])
+            self._pending = []
+            self._pending_sorted = None
+
+        # Each save writes a new postings file, meta.json points to it and is replaced last, so a
+        # crash or a concurrent `load` always sees a postings file that matches the vocabulary
+        previous = self._postings_name()
+        version = int(previous[len("postings-"):-len(".npz")]) + 1 if previous.startswith("postings-") else 1
+        postings_name = f"postings-{version}.npz"
+        with open(os.path.join(self.index_dir, postings_name + ".tmp"), "wb") as f:
+            np.savez(
+                f, indptr=self._indptr, doc_rows=self._doc_rows, term_freqs=self._term_freqs,
+                doc_lens=self._doc_lens, dates=self._dates, deleted=self._deleted,
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(os.path.join(self.index_dir, postings_name + ".tmp"), os.path.join(self.index_dir, postings_name))
+
+        with open(os.path.join(self.index_dir, "meta.json.tmp"), "w") as f:
+            json.dump({"vocab": list(self._vocab), "paper_ids": self.paper_ids, "postings": postings_name}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(os.path.join(self.index_dir, "meta.json.tmp"), os.path.join(self.index_dir, "meta.json"))
+        self._unsaved = []
+        self._postings = postings_name
+
+        # The previous postings are kept for readers that loaded the previous meta.json
+        for name in os.listdir(self.index_dir):
+            if name.startswith("postings") and name.endswith(".npz") and name not in (postings_name, previous):
+                os.remove(os.path.join(self.index_dir, name))
+
+    def _postings_name(self):
+        meta_path = os.path.join(self.index_dir, "meta.json")
+        if not os.path.exists(meta_path):
+            return "postings.npz"
+        with open(meta_path) as f:
+            return json.load(f).get("postings", "postings.npz")
+
+
+_bm25_indexes = {}
+_bm25_indexes_lock = threading.Lock()
+
+
+def get_bm25_index(index_dir, collection_name):
+    """
+    Process-wide BM25 index of a collection, loaded from disk on first use. The search tool and the
+    daily ingest share the same instance, so new papers are searchable right after they are added.
+    """
+    key = (index_dir, collection_name)
+    with _bm25_indexes_lock:
+        if key not in _bm25_indexes:
+            index = BM25Index.for_collection(index_dir, collection_name)
+            _bm25_indexes[key] = index.load() if index.exists() else index
+        return _bm25_indexes[key]
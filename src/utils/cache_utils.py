@@ -0,0 +1,73 @@
+import time
+import threading
+from collections import OrderedDict, defaultdict
+
+
+_invalidation_callbacks = defaultdict(list)
+
+
+class TTLCache:
+    """
+    Thread-safe bounded LRU cache whose entries also expire `ttl` seconds after they were set.
+    A `ttl` of None keeps entries until they are evicted. Hits and misses are counted.
+    """
+
+    def __init__(self, max_size=1024, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expired(self, set_time):
+        return self.ttl is not None and time.monotonic() - set_time > self.ttl
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or self._expired(item[1]):
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+            }
+
+
+def register_invalidation(topic, callback):
+    """Registers a callback, e.g. `cache.clear`, that runs whenever `topic` is invalidated."""
+    _invalidation_callbacks[topic].append(callback)
+
+
+def invalidate(topic):
+    """Runs the callbacks of a topic, e.g. after new papers were written to a collection."""
+    for callback in _invalidation_callbacks.get(topic, []):
+        callback()
@@ -0,0 +1,207 @@
+import os
+import re
+import json
+import zlib
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+
+import numpy as np
+
+
+_VERSION_SUFFIX = re.compile(r"v\d+$")
+_WORD_PATTERN = re.compile(r"\w+")
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+def normalize_paper_id(paper_id):
+    """Strips the URL prefix and the version suffix, `http://arxiv.org/abs/2401.01234v2` -> `2401.01234`."""
+    paper_id = paper_id.strip()
+    if "/abs/" in paper_id:
+        paper_id = paper_id.split("/abs/")[-1]
+    return _VERSION_SUFFIX.sub("", paper_id)
+
+
+def shingle_hashes(text, shingle_size=3):
+    """Hashes of the lower-cased word n-grams of a text, stable across processes."""
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) < shingle_size:
+        words = words + [""] * (shingle_size - len(words))
+    shingles = {" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+    return np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+
+
+class MinHasher:
+    """MinHash signatures of word shingles with `num_perm` universal hash functions."""
+
+    def __init__(self, num_perm=128, seed=1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=(num_perm, 1)).astype(np.uint64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=(num_perm, 1)).astype(np.uint64)
+
+    def signature(self, text):
+        hashes = shingle_hashes(text) % _MERSENNE_PRIME
+        # a < 2^31 and x < 2^31, so the products fit in uint64
+        return ((self._a * hashes[None, :] + self._b) % _MERSENNE_PRIME).min(axis=1).astype(np.uint32)
+
+
+def _band_keys(signature, num_bands):
+    rows_per_band = len(signature) // num_bands
+    keys = []
+    for band in range(num_bands):
+        digest = hashlib.blake2b(signature[band * rows_per_band:(band + 1) * rows_per_band].tobytes(), digest_size=8,
+                                 person=band.to_bytes(2, "little") + b"lsh").digest()
+        keys.append(int.from_bytes(digest, "little", signed=True))
+    return keys
+
+
+class PaperDeduplicator:
+    """
+    Dedup stage in front of the embedder.
+
+    Versions of the same paper (`2401.01234v1`, `2401.01234v2`) collapse on the normalized paper id and
+    only the last one in a batch is kept. Near-duplicates with a different id (re-submissions,
+    cross-listed copies) are found with MinHash/LSH over title and abstract: a paper is collapsed into
+    an already indexed one when their estimated Jaccard similarity is at least `threshold`.
+
+    Signatures and LSH buckets of the written papers are kept in an sqlite file next to the ingest
+    manifest, so bulk and daily ingests are deduplicated against the whole collection. Every collapsed
+    paper is appended to a JSONL report.
+    """
+
+    def __init__(self, path, report_path=None, threshold=0.85, num_perm=128, num_bands=16):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.report_path = report_path
+        self.threshold = threshold
+        self.num_bands = num_bands
+        self.minhasher = MinHasher(num_perm)
+        self.num_version_duplicates = 0
+        self.num_near_duplicates = 0
+
+        self._signatures = {}
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS signatures (paper_id TEXT PRIMARY KEY, signature BLOB NOT NULL);
+            CREATE TABLE IF NOT EXISTS buckets (key INTEGER NOT NULL, paper_id TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS buckets_key ON buckets (key);
+            CREATE INDEX IF NOT EXISTS buckets_paper_id ON buckets (paper_id);
+        """)
+        self._conn.commit()
+
+    @classmethod
+    def for_collection(cls, manifest_dir, collection_name, **kwargs):
+        return cls(
+            os.path.join(manifest_dir, f"{collection_name}.minhash.sqlite"),
+            report_path=os.path.join(manifest_dir, f"{collection_name}.dedup.jsonl"),
+            **kwargs
+        )
+
+    def _collapse_versions(self, documents, collapsed):
+        # Later entries are the more recent records of the same paper
+        latest = {}
+        for doc in documents:
+            paper_id = normalize_paper_id(doc.metadata['paper_id'])
+            if paper_id in latest:
+                collapsed.append({"paper_id": latest[paper_id].metadata['paper_id'], "duplicate_of": doc.metadata['paper_id'], "reason": "version"})
+            latest[paper_id] = doc
+        return list(latest.values())
+
+    def _lookup_buckets(self, keys):
+        buckets, signatures = {}, {}
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            rows = self._conn.execute(
+                f"SELECT b.key, b.paper_id, s.signature FROM buckets b JOIN signatures s ON s.paper_id = b.paper_id "
+                f"WHERE b.key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            for key, paper_id, signature in rows:
+                buckets.setdefault(key, []).append(paper_id)
+                signatures[paper_id] = np.frombuffer(signature, dtype=np.uint32)
+        return buckets, signatures
+
+    def deduplicate(self, documents):
+        """
+        Removes version duplicates and near-duplicates from a batch of documents.
+
+        Returns:
+            tuple: (documents to ingest, list of collapsed entries with `paper_id`, `duplicate_of`, `reason`)
+        """
+        collapsed = []
+        documents = self._collapse_versions(documents, collapsed)
+        self.num_version_duplicates += len(collapsed)
+
+        signatures = [self.minhasher.signature(doc.text) for doc in documents]
+        band_keys = [_band_keys(signature, self.num_bands) for signature in signatures]
+        with self._lock:
+            buckets, candidates = self._lookup_buckets(sorted({key for keys in band_keys for key in keys}))
+
+        # Papers of this batch are also matched against each other
+        kept = []
+        for doc, signature, keys in zip(documents, signatures, band_keys):
+            paper_id = doc.metadata['paper_id']
+            candidate_ids = {candidate_id for key in keys for candidate_id in buckets.get(key, ())}
+
+            best_id, best_similarity = None, 0.0
+            for candidate_id in candidate_ids:
+                if normalize_paper_id(candidate_id) == normalize_paper_id(paper_id):
+                    continue
+                candidate = candidates.get(candidate_id)
+                if candidate is None:
+                    candidate = self._signatures[candidate_id]
+                similarity = float(np.mean(candidate == signature))
+                if similarity > best_similarity:
+                    best_id, best_similarity = candidate_id, similarity
+
+            if best_id is not None and best_similarity >= self.threshold:
+                collapsed.append({"paper_id": paper_id, "duplicate_of": best_id, "reason": "near_duplicate", "similarity": round(best_similarity, 4)})
+                self.num_near_duplicates += 1
+                continue
+
+            kept.append(doc)
+            with self._lock:
+                self._signatures[paper_id] = signature
+            for key in keys:
+                buckets.setdefault(key, []).append(paper_id)
+
+        self._write_report(collapsed)
+        return kept, collapsed
+
+    def add(self, documents):
+        """Indexes the signatures of written documents, called once their batch is in the vector store."""
+        with self._lock:
+            rows, buckets = [], []
+            for doc in documents:
+                paper_id = doc.metadata['paper_id']
+                signature = self._signatures.pop(paper_id, None)
+                if signature is None:
+                    signature = self.minhasher.signature(doc.text)
+                rows.append((paper_id, signature.tobytes()))
+                buckets.extend((key, paper_id) for key in _band_keys(signature, self.num_bands))
+
+            paper_ids = [paper_id for paper_id, _ in rows]
+            for i in range(0, len(paper_ids), 500):
+                chunk = paper_ids[i:i + 500]
+                self._conn.execute(f"DELETE FROM buckets WHERE paper_id IN ({','.join('?' * len(chunk))})", chunk)
+            self._conn.executemany("INSERT OR REPLACE INTO signatures (paper_id, signature) VALUES (?, ?)", rows)
+            self._conn.executemany("INSERT INTO buckets (key, paper_id) VALUES (?, ?)", buckets)
+            self._conn.commit()
+
+    def _write_report(self, collapsed):
+        if not collapsed or self.report_path is None:
+            return
+        now = datetime.utcnow().isoformat()
+        with self._lock, open(self.report_path, "a") as f:
+            for entry in collapsed:
+                f.write(json.dumps({**entry, "collapsed_at": now}) + "\n")
+
+    def summary(self):
+        return (f"Collapsed {self.num_version_duplicates} paper versions and {self.num_near_duplicates} near-duplicates"
+                + (f", see {self.report_path}." if self.report_path else "."))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,301 @@
+import os
+import time
+import sqlite3
+import hashlib
+import resource
+import threading
+from typing import List, Optional
+
+import numpy as np
+import torch
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from llama_index.embeddings.huggingface.utils import format_query
+from llama_index.embeddings.openai import OpenAIEmbedding
+from llama_index.embeddings.ollama import OllamaEmbedding
+
+from src.constants import EMBEDDING_MODEL_NAME, EMBEDDING_SERVICE, EMBEDDING_CACHE_DIR
+
+
+def normalize_text(text):
+    return " ".join(text.split())
+
+
+class EmbeddingCache:
+    """
+    Content-addressed on-disk cache of embedding vectors.
+
+    Vectors are stored as rows of a float32 file that is read through a memory map, and an sqlite
+    index maps `sha1(model name, kind, normalized text)` to the row. Writes take the sqlite write lock
+    before appending, so several processes can share the same cache directory.
+    """
+
+    def __init__(self, cache_dir, model_name):
+        self.cache_dir = os.path.join(cache_dir, model_name.replace("/", "__"))
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.model_name = model_name
+        self.vectors_path = os.path.join(self.cache_dir, "vectors.f32")
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(self.cache_dir, "index.sqlite"), check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, row INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+        """)
+        self._conn.commit()
+        row = self._conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+        self.dim = int(row[0]) if row else None
+        self._mmap = None
+
+    def make_key(self, text, kind="text"):
+        return hashlib.sha1(f"{self.model_name}\0{kind}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def _get_mmap(self, max_row):
+        # Re-map the file when it has grown past the rows we have mapped
+        if self._mmap is None or self._mmap.shape[0] <= max_row:
+            num_rows = os.path.getsize(self.vectors_path) // (4 * self.dim)
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(num_rows, self.dim))
+        return self._mmap
+
+    def _select_rows(self, keys):
+        rows = {}
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            rows.update(self._conn.execute(
+                f"SELECT key, row FROM vectors WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall())
+        return rows
+
+    def get_many(self, keys: List[str]) -> List[Optional[Embedding]]:
+        results: List[Optional[Embedding]] = [None] * len(keys)
+        if self.dim is None or not keys:
+            self.misses += len(keys)
+            return results
+
+        with self._lock:
+            rows = self._select_rows(keys)
+            if rows:
+                vectors = self._get_mmap(max(rows.values()))
+                for i, key in enumerate(keys):
+                    if key in rows:
+                        results[i] = vectors[rows[key]].tolist()
+
+        num_hits = sum(result is not None for result in results)
+        self.hits += num_hits
+        self.misses += len(keys) - num_hits
+        return results
+
+    def put_many(self, keys: List[str], embeddings: List[Embedding]):
+        if not keys:
+            return
+
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock, so row numbers are not raced by other processes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self.dim is None:
+                    self.dim = vectors.shape[1]
+                    self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('dim', ?)", (str(self.dim),))
+
+                seen = set(self._select_rows(keys))
+                new_keys, new_rows = [], []
+                for key, vector in zip(keys, vectors):
+                    if key not in seen:
+                        seen.add(key)
+                        new_keys.append(key)
+                        new_rows.append(vector)
+
+                if new_keys:
+                    start_row = self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+                    with open(self.vectors_path, "ab") as f:
+                        f.truncate(start_row * 4 * self.dim)
+                        f.write(np.stack(new_rows).tobytes())
+                    self._conn.executemany(
+                        "INSERT INTO vectors (key, row) VALUES (?, ?)",
+                        [(key, start_row + i) for i, key in enumerate(new_keys)]
+                    )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self)}
+
+
+class CachedEmbedding(BaseEmbedding):
+    """Wraps any llama-index embedding model with an `EmbeddingCache`, the model is only called on misses."""
+
+    _embed_model: BaseEmbedding = PrivateAttr()
+    _cache: EmbeddingCache = PrivateAttr()
+
+    def __init__(self, embed_model: BaseEmbedding, cache: EmbeddingCache, **kwargs):
+        super().__init__(
+            model_name=embed_model.model_name,
+            embed_batch_size=embed_model.embed_batch_size,
+            callback_manager=embed_model.callback_manager,
+            **kwargs
+        )
+        self._embed_model = embed_model
+        self._cache = cache
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def cache(self) -> EmbeddingCache:
+        return self._cache
+
+    @property
+    def embed_model(self) -> BaseEmbedding:
+        return self._embed_model
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        key = self._cache.make_key(query, kind="query")
+        embedding = self._cache.get_many([key])[0]
+        if embedding is None:
+            embedding = self._embed_model._get_query_embedding(query)
+            self._cache.put_many([key], [embedding])
+        return embedding
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        key = self._cache.make_key(query, kind="query")
+        embedding = self._cache.get_many([key])[0]
+        if embedding is None:
+            embedding = await self._embed_model._aget_query_embedding(query)
+            self._cache.put_many([key], [embedding])
+        return embedding
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _split_misses(self, texts: List[str]):
+        keys = [self._cache.make_key(text) for text in texts]
+        embeddings = self._cache.get_many(keys)
+        miss_idx = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        return keys, embeddings, miss_idx
+
+    def _fill_misses(self, keys, embeddings, miss_idx, miss_embeddings):
+        for i, embedding in zip(miss_idx, miss_embeddings):
+            embeddings[i] = embedding
+        self._cache.put_many([keys[i] for i in miss_idx], miss_embeddings)
+        return embeddings
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        keys, embeddings, miss_idx = self._split_misses(texts)
+        if not miss_idx:
+            return embeddings
+        miss_embeddings = self._embed_model._get_text_embeddings([texts[i] for i in miss_idx])
+        return self._fill_misses(keys, embeddings, miss_idx, miss_embeddings)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        keys, embeddings, miss_idx = self._split_misses(texts)
+        if not miss_idx:
+            return embeddings
+        miss_embeddings = await self._embed_model._aget_text_embeddings([texts[i] for i in miss_idx])
+        return self._fill_misses(keys, embeddings, miss_idx, miss_embeddings)
+
+
+def embed_queries(embed_model, queries: List[str]) -> List[Embedding]:
+    """
+    Embeds several search queries with one batched forward pass. llama-index only batches document
+    embeddings, so HuggingFace models are called directly with their query instruction and other
+    services fall back to one call per query. Cached query embeddings are reused.
+    """
+    if not queries:
+        return []
+
+    if isinstance(embed_model, CachedEmbedding):
+        keys = [embed_model.cache.make_key(query, kind="query") for query in queries]
+        embeddings = embed_model.cache.get_many(keys)
+        miss_idx = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if miss_idx:
+            miss_embeddings = embed_queries(embed_model.embed_model, [queries[i] for i in miss_idx])
+            for i, embedding in zip(miss_idx, miss_embeddings):
+                embeddings[i] = embedding
+            embed_model.cache.put_many([keys[i] for i in miss_idx], miss_embeddings)
+        return embeddings
+    elif isinstance(embed_model, HuggingFaceEmbedding):
+        return embed_model._embed([format_query(query, embed_model.model_name, embed_model.query_instruction) for query in queries])
+    return [embed_model.get_query_embedding(query) for query in queries]
+
+
+def load_embed_model(embed_batch_size=64, use_cache=True):
+    """
+    Loads the embedding model of the configured `EMBEDDING_SERVICE`, wrapped with the on-disk
+    embedding cache when `EMBEDDING_CACHE_DIR` is set.
+    """
+    if EMBEDDING_SERVICE == "ollama":
+        embed_model = OllamaEmbedding(model_name=EMBEDDING_MODEL_NAME)
+    elif EMBEDDING_SERVICE == "hf":
+        device_type = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        embed_model = HuggingFaceEmbedding(model_name=EMBEDDING_MODEL_NAME, cache_folder="./models", device=device_type, embed_batch_size=embed_batch_size)
+    elif EMBEDDING_SERVICE == "openai":
+        embed_model = OpenAIEmbedding(model=EMBEDDING_MODEL_NAME, api_key=os.environ["OPENAI_API_KEY"])
+    else:
+        raise NotImplementedError()
+
+    if use_cache and EMBEDDING_CACHE_DIR:
+        embed_model = CachedEmbedding(embed_model, EmbeddingCache(EMBEDDING_CACHE_DIR, EMBEDDING_MODEL_NAME))
+    return embed_model
+
+
+_embed_models = {}
+_embed_model_stats = {}
+_embed_models_lock = threading.Lock()
+
+
+def _model_size_bytes(embed_model):
+    if isinstance(embed_model, CachedEmbedding):
+        embed_model = embed_model.embed_model
+    model = getattr(embed_model, "_model", None)
+    if model is None or not hasattr(model, "parameters"):
+        return None
+    return sum(param.numel() * param.element_size() for param in model.parameters())
+
+
+def get_embed_model(embed_batch_size=64, use_cache=True):
+    """
+    Process-wide registry around `load_embed_model`. The configured model is built once on first use
+    and the same instance is shared by all tools and tasks of the process, so the scheduled daily
+    ingest does not load a second copy next to the paper search tool. The batch size of the first
+    caller is kept.
+    """
+    key = (EMBEDDING_SERVICE, EMBEDDING_MODEL_NAME, use_cache)
+    with _embed_models_lock:
+        if key not in _embed_models:
+            start_time = time.time()
+            start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            _embed_models[key] = load_embed_model(embed_batch_size=embed_batch_size, use_cache=use_cache)
+
+            model_bytes = _model_size_bytes(_embed_models[key])
+            stats = {
+                "service": EMBEDDING_SERVICE,
+                "model_name": EMBEDDING_MODEL_NAME,
+                "cached": use_cache,
+                "load_seconds": round(time.time() - start_time, 3),
+                # ru_maxrss is in KB on Linux, this is the growth of the peak RSS while loading
+                "rss_delta_mb": round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - start_rss) / 1024, 1),
+                "parameters_mb": round(model_bytes / 2 ** 20, 1) if model_bytes is not None else None,
+            }
+            _embed_model_stats[key] = stats
+            print(f"Embed model {EMBEDDING_MODEL_NAME} loaded in {stats['load_seconds']}s "
+                  f"(parameters: {stats['parameters_mb']} MB, RSS +{stats['rss_delta_mb']} MB).")
+        return _embed_models[key]
+
+
+def embed_model_stats():
+    """Load time and memory footprint of the embedding models loaded through `get_embed_model`."""
+    with _embed_models_lock:
+        return [dict(stats) for stats in _embed_model_stats.values()]
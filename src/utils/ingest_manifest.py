@@ -0,0 +1,160 @@
+import os
+import sqlite3
+import threading
+import hashlib
+from datetime import datetime
+
+
+class IngestManifest:
+    """
+    Persistent record of the papers already written to a paper collection.
+
+    Each `paper_id` is stored with the hash of its embedded text, so re-runs only embed new or
+    changed papers. Papers are marked `pending` before a batch is written and `done` once the
+    batch is in the vector store, together with an optional checkpoint cursor, so a crashed
+    ingest resumes after the last committed batch. Papers the dedup stage collapsed are marked
+    `duplicate` with the id they were collapsed into and are skipped like written papers.
+
+    The connection is shared with the background vector-store writer, so access is serialized by a lock.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS papers (
+                paper_id TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                status TEXT NOT NULL,
+                ingested_at TEXT NOT NULL,
+                duplicate_of TEXT
+            );
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+        # Manifests created before duplicates were recorded
+        if "duplicate_of" not in {row[1] for row in self._conn.execute("PRAGMA table_info(papers)")}:
+            self._conn.execute("ALTER TABLE papers ADD COLUMN duplicate_of TEXT")
+        self._conn.commit()
+
+    @classmethod
+    def for_collection(cls, manifest_dir, collection_name):
+        return cls(os.path.join(manifest_dir, f"{collection_name}.sqlite"))
+
+    @staticmethod
+    def content_hash(text):
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM papers WHERE status = 'done'").fetchone()[0]
+
+    def _known_papers(self, documents):
+        paper_ids = [doc.metadata['paper_id'] for doc in documents]
+        known = {}
+        with self._lock:
+            for i in range(0, len(paper_ids), 500):
+                chunk = paper_ids[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT paper_id, content_hash, status FROM papers WHERE paper_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                known.update({paper_id: (content_hash, status) for paper_id, content_hash, status in rows})
+        return known
+
+    def split_documents(self, documents):
+        """
+        Splits documents into the ones that need to be embedded and the ids of the papers whose
+        previous vectors are stale (changed abstract or interrupted write) and must be deleted first.
+        Unchanged papers that were written or collapsed as duplicates are skipped.
+
+        Returns:
+            tuple: (documents to embed, list of stale paper ids)
+        """
+        known = self._known_papers(documents)
+        to_embed, stale_ids = [], []
+        for doc in documents:
+            paper_id = doc.metadata['paper_id']
+            if paper_id not in known:
+                to_embed.append(doc)
+                continue
+
+            content_hash, status = known[paper_id]
+            if status in ("done", "duplicate") and content_hash == self.content_hash(doc.text):
+                continue
+            to_embed.append(doc)
+            # A collapsed duplicate has no vectors
+            if status != "duplicate":
+                stale_ids.append(paper_id)
+
+        return to_embed, stale_ids
+
+    def written_documents(self, documents):
+        """The documents whose current text is in the vector store."""
+        known = self._known_papers(documents)
+        return [
+            doc for doc in documents
+            if known.get(doc.metadata['paper_id']) == (self.content_hash(doc.text), "done")
+        ]
+
+    def _upsert(self, documents, status):
+        now = datetime.utcnow().isoformat()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO papers (paper_id, content_hash, status, ingested_at) VALUES (?, ?, ?, ?)",
+            [(doc.metadata['paper_id'], self.content_hash(doc.text), status, now) for doc in documents]
+        )
+
+    def mark_pending(self, documents):
+        with self._lock:
+            self._upsert(documents, "pending")
+            self._conn.commit()
+
+    def mark_duplicates(self, documents, duplicate_of):
+        """Marks documents collapsed by the dedup stage, `duplicate_of` maps their paper id to the kept one."""
+        now = datetime.utcnow().isoformat()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO papers (paper_id, content_hash, status, ingested_at, duplicate_of) VALUES (?, ?, 'duplicate', ?, ?)",
+                [
+                    (doc.metadata['paper_id'], self.content_hash(doc.text), now, duplicate_of[doc.metadata['paper_id']])
+                    for doc in documents
+                ]
+            )
+            self._conn.commit()
+
+    def mark_done(self, documents, checkpoint_name=None, checkpoint_value=None):
+        """Marks the documents as written and moves the checkpoint in the same transaction."""
+        with self._lock:
+            self._upsert(documents, "done")
+            if checkpoint_name is not None:
+                self._set_checkpoint(checkpoint_name, checkpoint_value)
+            self._conn.commit()
+
+    def get_checkpoint(self, name, default=None):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM checkpoints WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else default
+
+    def _set_checkpoint(self, name, value):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO checkpoints (name, value) VALUES (?, ?)", (name, str(value))
+        )
+
+    def set_checkpoint(self, name, value):
+        with self._lock:
+            self._set_checkpoint(name, value)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def delete_stale_papers(vector_store, paper_ids):
+    """Removes the previous vectors of the given papers, documents are ingested with `id_=paper_id`."""
+    for paper_id in paper_ids:
+        vector_store.delete(paper_id)
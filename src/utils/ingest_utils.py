@@ -0,0 +1,221 @@
+import os
+import time
+import multiprocessing
+from collections import deque
+
+from llama_index.core.schema import MetadataMode, NodeRelationship, TextNode
+
+from src.constants import EMBEDDING_CACHE_DIR, EMBEDDING_MODEL_NAME
+from src.utils.ingest_manifest import delete_stale_papers
+from src.utils.embedding_utils import EmbeddingCache, load_embed_model
+from src.utils.paper_metadata_store import paper_node_id
+from src.utils.vector_store_utils import BulkVectorStoreWriter, write_nodes
+
+
+def documents_to_nodes(documents):
+    """
+    Paper abstracts fit in a single chunk, so each document maps to exactly one node. Node ids are
+    derived from the paper id, which makes re-writing the same paper idempotent.
+    """
+    nodes = []
+    for doc in documents:
+        node = TextNode(
+            id_=paper_node_id(doc.metadata['paper_id']),
+            text=doc.text,
+            metadata=doc.metadata,
+            excluded_embed_metadata_keys=doc.excluded_embed_metadata_keys,
+            excluded_llm_metadata_keys=doc.excluded_llm_metadata_keys,
+        )
+        node.relationships[NodeRelationship.SOURCE] = doc.as_related_node_info()
+        nodes.append(node)
+    return nodes
+
+
+class SparseIndexCheckpoint:
+    """
+    Adds written batches to a BM25 index and saves it every `save_every` batches. The batches are
+    marked done in the manifest, which moves the resume checkpoint, only after the index holding them
+    is saved, so a crash never skips papers that are missing from the saved index.
+    """
+
+    def __init__(self, sparse_index, manifest=None, save_every=1):
+        self.sparse_index = sparse_index
+        self.manifest = manifest
+        self.save_every = max(1, save_every)
+        self._batches = []
+
+    def add(self, documents, checkpoint_name=None, checkpoint_value=None):
+        self.sparse_index.add_documents(documents)
+        self._batches.append((documents, checkpoint_name, checkpoint_value))
+        if len(self._batches) >= self.save_every:
+            self.flush()
+
+    def flush(self):
+        """Saves the index and commits the batches added since the last save."""
+        self.sparse_index.save()
+        if self.manifest is not None:
+            for documents, checkpoint_name, checkpoint_value in self._batches:
+                self.manifest.mark_done(documents, checkpoint_name, checkpoint_value)
+        self._batches = []
+
+
+def _prepare_batch(documents, vector_store, manifest, deduplicator=None):
+    stale_ids = []
+    if manifest is not None:
+        documents, stale_ids = manifest.split_documents(documents)
+    if deduplicator is not None:
+        documents_by_id = {doc.metadata['paper_id']: doc for doc in documents}
+        documents, collapsed = deduplicator.deduplicate(documents)
+        if manifest is not None and collapsed:
+            # Recorded so the next run skips them instead of collapsing and reporting them again
+            duplicate_of = {entry['paper_id']: entry['duplicate_of'] for entry in collapsed}
+            manifest.mark_duplicates([documents_by_id[paper_id] for paper_id in duplicate_of], duplicate_of)
+    if manifest is not None:
+        # Only papers that are re-embedded lose their previous vectors, a changed paper that is
+        # collapsed as a duplicate keeps them
+        kept_ids = {doc.metadata['paper_id'] for doc in documents}
+        delete_stale_papers(vector_store, [paper_id for paper_id in stale_ids if paper_id in kept_ids])
+        manifest.mark_pending(documents)
+    return documents, documents_to_nodes(documents)
+
+
+def _commit_batch(nodes, documents, vector_store, manifest, checkpoint_name=None, checkpoint_value=None, writer=None, deduplicator=None, sparse_index=None, metadata_store=None):
+    def on_written():
+        if deduplicator is not None:
+            deduplicator.add(documents)
+        if metadata_store is not None:
+            metadata_store.add_nodes(nodes)
+        if isinstance(sparse_index, SparseIndexCheckpoint):
+            # The batch is marked done once the BM25 index holding it is saved
+            sparse_index.add(documents, checkpoint_name, checkpoint_value)
+            return
+        if sparse_index is not None:
+            sparse_index.add_documents(documents)
+        if manifest is not None:
+            manifest.mark_done(documents, checkpoint_name, checkpoint_value)
+
+    if writer is not None:
+        writer.put(nodes, on_written=on_written)
+    else:
+        write_nodes(vector_store, nodes)
+        on_written()
+
+
+def ingest_documents(documents, vector_store, embed_model, manifest=None, checkpoint_name=None, checkpoint_value=None, writer=None, deduplicator=None, sparse_index=None, metadata_store=None):
+    """
+    Embeds and writes a batch of paper documents to the vector store.
+
+    When a manifest is given, papers that are already ingested with the same content are skipped,
+    stale vectors of changed papers are deleted first, and the batch is committed to the manifest
+    (with the checkpoint cursor) only after it is written. With a `BulkVectorStoreWriter` the write
+    happens in the background while the caller embeds the next batch. With a `PaperDeduplicator`,
+    older versions and near-duplicates of already indexed papers are dropped before embedding.
+    Written papers are also added to the `sparse_index` (BM25) and the `metadata_store` when given.
+    With a `SparseIndexCheckpoint` as `sparse_index`, the batch is committed to the manifest when the
+    checkpoint saves the BM25 index.
+
+    Returns:
+        list: The documents that were actually embedded.
+    """
+    documents, nodes = _prepare_batch(documents, vector_store, manifest, deduplicator)
+
+    if nodes:
+        embeddings = embed_model.get_text_embedding_batch(
+            [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+        )
+        for node, embedding in zip(nodes, embeddings):
+            node.embedding = embedding
+
+    _commit_batch(nodes, documents, vector_store, manifest, checkpoint_name, checkpoint_value, writer, deduplicator, sparse_index, metadata_store)
+    return documents
+
+
+_worker_embed_model = None
+
+
+def _init_embed_worker(embed_batch_size, num_threads):
+    global _worker_embed_model
+    import torch
+    torch.set_num_threads(num_threads)
+    # Each worker holds its own model copy, the vectors are cached by the parent process
+    _worker_embed_model = load_embed_model(embed_batch_size=embed_batch_size, use_cache=False)
+
+
+def _embed_texts(texts):
+    return _worker_embed_model.get_text_embedding_batch(texts)
+
+
+def ingest_document_batches_parallel(document_batches, vector_store, num_workers, manifest=None, checkpoint_name=None, embed_batch_size=32, deduplicator=None, sparse_index=None, metadata_store=None):
+    """
+    Embeds document batches on a pool of worker processes while a single `BulkVectorStoreWriter`
+    in the calling process writes them to the vector store.
+
+    Batches are dispatched in order with at most `2 * num_workers` in flight, so the manifest
+    checkpoint always points after the last batch that was fully written.
+
+    Args:
+        document_batches (iterable): `(documents, checkpoint_value)` tuples.
+        vector_store: The vector store to write to.
+        num_workers (int): Number of embedding processes.
+        manifest (IngestManifest, optional): Manifest used to skip unchanged papers.
+        checkpoint_name (str, optional): Manifest checkpoint to move after each batch.
+        embed_batch_size (int, optional): Batch size of the model inside each worker.
+        deduplicator (PaperDeduplicator, optional): Dedup stage applied before embedding.
+        sparse_index (BM25Index | SparseIndexCheckpoint, optional): Sparse index the written papers are added to.
+        metadata_store (PaperMetadataStore, optional): Metadata table the written papers are added to.
+
+    Returns:
+        int: Number of embedded documents.
+    """
+    cache = EmbeddingCache(EMBEDDING_CACHE_DIR, EMBEDDING_MODEL_NAME) if EMBEDDING_CACHE_DIR else None
+    num_threads = max(1, (os.cpu_count() or 1) // num_workers)
+    ctx = multiprocessing.get_context("spawn")
+
+    num_embedded = 0
+    start_time = time.time()
+    in_flight = deque()
+    batches = iter(document_batches)
+    exhausted = False
+
+    with ctx.Pool(num_workers, initializer=_init_embed_worker, initargs=(embed_batch_size, num_threads)) as pool, \
+            BulkVectorStoreWriter(vector_store) as writer:
+        while in_flight or not exhausted:
+            # Keep the workers busy with a bounded number of pending batches
+            while not exhausted and len(in_flight) < 2 * num_workers:
+                try:
+                    documents, checkpoint_value = next(batches)
+                except StopIteration:
+                    exhausted = True
+                    break
+
+                documents, nodes = _prepare_batch(documents, vector_store, manifest, deduplicator)
+                texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+                keys, embeddings, miss_idx = [], [None] * len(texts), list(range(len(texts)))
+                if cache is not None and texts:
+                    keys = [cache.make_key(text) for text in texts]
+                    embeddings = cache.get_many(keys)
+                    miss_idx = [i for i, embedding in enumerate(embeddings) if embedding is None]
+
+                result = pool.apply_async(_embed_texts, ([texts[i] for i in miss_idx],)) if miss_idx else None
+                in_flight.append((documents, nodes, keys, embeddings, miss_idx, result, checkpoint_value))
+
+            if not in_flight:
+                break
+
+            documents, nodes, keys, embeddings, miss_idx, result, checkpoint_value = in_flight.popleft()
+            if result is not None:
+                miss_embeddings = result.get()
+                for i, embedding in zip(miss_idx, miss_embeddings):
+                    embeddings[i] = embedding
+                if cache is not None:
+                    cache.put_many([keys[i] for i in miss_idx], miss_embeddings)
+
+            for node, embedding in zip(nodes, embeddings):
+                node.embedding = embedding
+            _commit_batch(nodes, documents, vector_store, manifest, checkpoint_name, checkpoint_value, writer, deduplicator, sparse_index, metadata_store)
+
+            num_embedded += len(nodes)
+            elapsed = time.time() - start_time
+            print(f"Embedded {num_embedded} papers ({num_embedded / max(elapsed, 1e-6):.1f} docs/sec).")
+
+    return num_embedded
@@ -0,0 +1,384 @@
+import os
+import json
+import fcntl
+import sqlite3
+import threading
+from typing import Any, List
+
+import hnswlib
+import numpy as np
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode, MetadataMode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    FilterOperator,
+    VectorStoreQuery,
+    VectorStoreQueryResult
+)
+from llama_index.core.vector_stores.utils import metadata_dict_to_node, node_to_metadata_dict
+
+
+class LocalHNSWVectorStore(BasePydanticVectorStore):
+    """
+    In-process vector store, no server needed.
+
+    Normalized float32 vectors are appended to `vectors.f32`, which is read through a memory map, and
+    indexed by an HNSW graph (`hnsw.bin`) whose labels are the row numbers. Node metadata and text
+    live in `nodes.sqlite`. Upserts mark the previous row as deleted, so papers can be added
+    incrementally by the daily task. Rows written after the last `persist` are re-indexed from the
+    vector file on load.
+
+    Appends hold an exclusive lock on `vectors.lock` and first load the rows other processes added,
+    so the ingest script and the daily task of the API can write the same store. Row numbers are
+    allocated from `nodes.sqlite` under the lock.
+
+    Filters on the `date` timestamp are applied inside the graph search. When the date range
+    contains few papers, an exact search over the matching rows is used instead.
+    """
+
+    stores_text: bool = True
+    persist_dir: str
+    M: int
+    ef_construction: int
+    ef_search: int
+    exact_search_limit: int
+
+    _lock: Any = PrivateAttr()
+    _conn: Any = PrivateAttr()
+    _index: Any = PrivateAttr()
+    _dim: Any = PrivateAttr()
+    _dates: Any = PrivateAttr()
+    _deleted: Any = PrivateAttr()
+    _mmap: Any = PrivateAttr()
+
+    def __init__(self, persist_dir: str, M: int = 16, ef_construction: int = 200, ef_search: int = 64, exact_search_limit: int = 20000, **kwargs: Any):
+        super().__init__(
+            persist_dir=persist_dir, M=M, ef_construction=ef_construction, ef_search=ef_search,
+            exact_search_limit=exact_search_limit, **kwargs
+        )
+        os.makedirs(persist_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(persist_dir, "nodes.sqlite"), check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS nodes (
+                row INTEGER PRIMARY KEY,
+                node_id TEXT NOT NULL,
+                ref_doc_id TEXT,
+                paper_id TEXT,
+                date REAL,
+                metadata TEXT NOT NULL,
+                text TEXT NOT NULL,
+                deleted INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS nodes_node_id ON nodes (node_id);
+            CREATE INDEX IF NOT EXISTS nodes_ref_doc_id ON nodes (ref_doc_id);
+            CREATE INDEX IF NOT EXISTS nodes_paper_id ON nodes (paper_id);
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+        """)
+        self._conn.commit()
+
+        row = self._conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+        self._dim = int(row[0]) if row else None
+        rows = self._conn.execute("SELECT date, deleted FROM nodes ORDER BY row").fetchall()
+        self._dates = np.array([np.nan if date is None else date for date, _ in rows], dtype=np.float64)
+        self._deleted = np.array([deleted for _, deleted in rows], dtype=bool)
+        self._mmap = None
+        self._index = None
+        if self._dim is not None:
+            self._load_index()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LocalHNSWVectorStore"
+
+    @property
+    def client(self) -> Any:
+        return self._index
+
+    @property
+    def vectors_path(self):
+        return os.path.join(self.persist_dir, "vectors.f32")
+
+    @property
+    def index_path(self):
+        return os.path.join(self.persist_dir, "hnsw.bin")
+
+    @property
+    def lock_path(self):
+        return os.path.join(self.persist_dir, "vectors.lock")
+
+    def __len__(self):
+        return int((~self._deleted).sum())
+
+    def _load_index(self):
+        num_rows = len(self._dates)
+        self._index = hnswlib.Index(space="ip", dim=self._dim)
+        if os.path.exists(self.index_path):
+            self._index.load_index(self.index_path, max_elements=max(num_rows, 1024))
+        else:
+            self._index.init_index(max_elements=max(num_rows, 1024), ef_construction=self.ef_construction, M=self.M)
+        self._index.set_ef(self.ef_search)
+
+        # Rows appended after the last persist are only in the vector file
+        num_indexed = self._index.get_current_count()
+        if num_indexed < num_rows:
+            vectors = self._vectors()
+            self._index.add_items(np.asarray(vectors[num_indexed:num_rows]), np.arange(num_indexed, num_rows))
+        for row in np.flatnonzero(self._deleted):
+            self._mark_deleted(row)
+
+    def _vectors(self):
+        num_rows = len(self._dates)
+        if self._mmap is None or self._mmap.shape[0] < num_rows:
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(num_rows, self._dim))
+        return self._mmap
+
+    def _mark_deleted(self, row):
+        try:
+            self._index.mark_deleted(int(row))
+        except RuntimeError:
+            # Already deleted
+            pass
+
+    def _delete_rows(self, rows):
+        if not rows:
+            return
+        self._conn.executemany("UPDATE nodes SET deleted = 1 WHERE row = ?", [(int(row),) for row in rows])
+        self._deleted[rows] = True
+        for row in rows:
+            self._mark_deleted(row)
+
+    def _refresh(self):
+        """Loads the rows and deletions other processes committed since this store was opened."""
+        num_rows = len(self._dates)
+        new_rows = self._conn.execute("SELECT date, deleted FROM nodes WHERE row >= ? ORDER BY row", (num_rows,)).fetchall()
+        deleted_rows = [row for row, in self._conn.execute("SELECT row FROM nodes WHERE deleted = 1 AND row < ?", (num_rows,))]
+        deleted_rows = [row for row in deleted_rows if not self._deleted[row]]
+        if new_rows:
+            self._dates = np.concatenate([self._dates, [np.nan if date is None else date for date, _ in new_rows]])
+            self._deleted = np.concatenate([self._deleted, [bool(deleted) for _, deleted in new_rows]])
+        self._deleted[deleted_rows] = True
+
+        if self._dim is None:
+            row = self._conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+            if row:
+                self._dim = int(row[0])
+                self._load_index()
+            return
+        if new_rows:
+            total_rows = len(self._dates)
+            if self._index.get_max_elements() < total_rows:
+                self._index.resize_index(max(2 * self._index.get_max_elements(), total_rows))
+            self._index.add_items(np.asarray(self._vectors()[num_rows:total_rows]), np.arange(num_rows, total_rows))
+            deleted_rows.extend(num_rows + np.flatnonzero(self._deleted[num_rows:]))
+        for row in deleted_rows:
+            self._mark_deleted(row)
+
+    def add(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+        if not nodes:
+            return []
+
+        vectors = np.asarray([node.get_embedding() for node in nodes], dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+        with self._lock, open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                return self._append_rows(nodes, vectors)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _append_rows(self, nodes, vectors):
+        self._refresh()
+        if self._dim is None:
+            self._dim = vectors.shape[1]
+            self._conn.execute("INSERT INTO meta (name, value) VALUES ('dim', ?)", (str(self._dim),))
+            self._load_index()
+
+        # Upsert: previous rows of the same nodes are replaced
+        node_ids = [node.node_id for node in nodes]
+        previous_rows = []
+        for i in range(0, len(node_ids), 500):
+            chunk = node_ids[i:i + 500]
+            previous_rows.extend(row for row, in self._conn.execute(
+                f"SELECT row FROM nodes WHERE deleted = 0 AND node_id IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        self._delete_rows(previous_rows)
+
+        # Rows of the vector file past the last committed row belong to an interrupted write
+        max_row, = self._conn.execute("SELECT MAX(row) FROM nodes").fetchone()
+        start_row = 0 if max_row is None else max_row + 1
+        rows = np.arange(start_row, start_row + len(nodes))
+        with open(self.vectors_path, "ab") as f:
+            if os.path.getsize(self.vectors_path) != start_row * 4 * self._dim:
+                f.truncate(start_row * 4 * self._dim)
+            f.write(vectors.tobytes())
+
+        self._conn.executemany(
+            "INSERT INTO nodes (row, node_id, ref_doc_id, paper_id, date, metadata, text) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    int(row), node.node_id, node.ref_doc_id, node.metadata.get("paper_id"), self._node_date(node),
+                    json.dumps(node_to_metadata_dict(node, remove_text=True, flat_metadata=False)),
+                    node.get_content(metadata_mode=MetadataMode.NONE),
+                )
+                for row, node in zip(rows, nodes)
+            ]
+        )
+        self._conn.commit()
+
+        if self._index.get_max_elements() < start_row + len(nodes):
+            self._index.resize_index(max(2 * self._index.get_max_elements(), start_row + len(nodes)))
+        self._index.add_items(vectors, rows)
+        self._dates = np.concatenate([self._dates, [self._node_date(node) or np.nan for node in nodes]])
+        self._deleted = np.concatenate([self._deleted, np.zeros(len(nodes), dtype=bool)])
+        return node_ids
+
+    @staticmethod
+    def _node_date(node):
+        date = node.metadata.get("date")
+        return float(date) if isinstance(date, (int, float)) else None
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        with self._lock:
+            rows = [row for row, in self._conn.execute(
+                "SELECT row FROM nodes WHERE deleted = 0 AND ref_doc_id = ?", (ref_doc_id,)
+            )]
+            self._delete_rows(rows)
+            self._conn.commit()
+
+    def persist(self, persist_path: str = None, fs: Any = None) -> None:
+        """Saves the HNSW graph, the vectors and nodes are written on `add`."""
+        with self._lock, open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # The saved graph covers the rows of all writers
+                self._refresh()
+                if self._index is not None:
+                    self._index.save_index(self.index_path + ".tmp")
+                    os.replace(self.index_path + ".tmp", self.index_path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _allowed_rows(self, query):
+        if query.filters is None or not query.filters.filters:
+            return None
+
+        allowed = ~self._deleted
+        for metadata_filter in query.filters.filters:
+            if getattr(metadata_filter, "key", None) != "date":
+                raise NotImplementedError(f"LocalHNSWVectorStore only filters on `date`, got {metadata_filter}")
+            value = metadata_filter.value
+            if metadata_filter.operator == FilterOperator.GTE:
+                allowed &= self._dates >= value
+            elif metadata_filter.operator == FilterOperator.GT:
+                allowed &= self._dates > value
+            elif metadata_filter.operator == FilterOperator.LTE:
+                allowed &= self._dates <= value
+            elif metadata_filter.operator == FilterOperator.LT:
+                allowed &= self._dates < value
+            elif metadata_filter.operator == FilterOperator.EQ:
+                allowed &= self._dates == value
+            else:
+                raise NotImplementedError(f"Unsupported date filter operator {metadata_filter.operator}")
+        return allowed
+
+    def _exact_search(self, query_vectors, rows, top_k):
+        scores = query_vectors @ np.asarray(self._vectors()[rows]).T
+        best = np.argsort(-scores, axis=1)[:, :top_k]
+        return rows[best], np.take_along_axis(scores, best, axis=1)
+
+    def _fetch_nodes(self, rows):
+        nodes = {}
+        rows = [int(row) for row in rows]
+        for i in range(0, len(rows), 500):
+            chunk = rows[i:i + 500]
+            for row, metadata, text in self._conn.execute(
+                f"SELECT row, metadata, text FROM nodes WHERE row IN ({','.join('?' * len(chunk))})", chunk
+            ):
+                node = metadata_dict_to_node(json.loads(metadata))
+                node.set_content(text)
+                nodes[row] = node
+        return [nodes[row] for row in rows]
+
+    def _node_ids(self, rows):
+        rows = [int(row) for row in rows]
+        node_ids = {}
+        for i in range(0, len(rows), 500):
+            chunk = rows[i:i + 500]
+            node_ids.update(self._conn.execute(
+                f"SELECT row, node_id FROM nodes WHERE row IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        return [node_ids[row] for row in rows]
+
+    def get_nodes_by_ids(self, node_ids):
+        with self._lock:
+            rows = []
+            for i in range(0, len(node_ids), 500):
+                chunk = list(node_ids[i:i + 500])
+                rows.extend(row for row, in self._conn.execute(
+                    f"SELECT row FROM nodes WHERE deleted = 0 AND node_id IN ({','.join('?' * len(chunk))})", chunk
+                ))
+            return self._fetch_nodes(rows)
+
+    def get_nodes_by_paper_ids(self, paper_ids):
+        with self._lock:
+            rows = []
+            for i in range(0, len(paper_ids), 500):
+                chunk = list(paper_ids[i:i + 500])
+                rows.extend(row for row, in self._conn.execute(
+                    f"SELECT row FROM nodes WHERE deleted = 0 AND paper_id IN ({','.join('?' * len(chunk))})", chunk
+                ))
+            return self._fetch_nodes(rows)
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        return self.query_batch([query])[0]
+
+    def query_batch(self, queries: List[VectorStoreQuery], with_nodes: bool = True) -> List[VectorStoreQueryResult]:
+        """
+        Runs several queries with one graph search (or one matrix product for exact searches) per
+        group of queries that share the same filters and `similarity_top_k`. Without `with_nodes`
+        only the ids and scores are returned.
+        """
+        results = [VectorStoreQueryResult(nodes=[], similarities=[], ids=[]) for _ in queries]
+        with self._lock:
+            if self._index is None or len(self) == 0:
+                return results
+
+            groups = {}
+            for i, query in enumerate(queries):
+                groups.setdefault((repr(query.filters), query.similarity_top_k), []).append(i)
+
+            for query_idx in groups.values():
+                query_vectors = np.asarray([queries[i].query_embedding for i in query_idx], dtype=np.float32)
+                query_vectors /= np.maximum(np.linalg.norm(query_vectors, axis=1, keepdims=True), 1e-12)
+                allowed = self._allowed_rows(queries[query_idx[0]])
+                num_allowed = len(self) if allowed is None else int(allowed.sum())
+                top_k = min(queries[query_idx[0]].similarity_top_k, num_allowed)
+                if top_k == 0:
+                    continue
+
+                if allowed is not None and num_allowed <= self.exact_search_limit:
+                    rows, scores = self._exact_search(query_vectors, np.flatnonzero(allowed), top_k)
+                else:
+                    try:
+                        labels, distances = self._index.knn_query(
+                            query_vectors, k=top_k, filter=(lambda label: allowed[label]) if allowed is not None else None
+                        )
+                        rows, scores = labels, 1 - distances
+                    except RuntimeError:
+                        # The graph search could not reach top_k allowed rows
+                        rows, scores = self._exact_search(query_vectors, np.flatnonzero(allowed if allowed is not None else ~self._deleted), top_k)
+
+                if with_nodes:
+                    nodes = self._fetch_nodes(rows.ravel())
+                    node_ids = [node.node_id for node in nodes]
+                else:
+                    nodes, node_ids = None, self._node_ids(rows.ravel())
+                for j, i in enumerate(query_idx):
+                    results[i] = VectorStoreQueryResult(
+                        nodes=nodes[j * top_k:(j + 1) * top_k] if with_nodes else None,
+                        similarities=[float(score) for score in scores[j]],
+                        ids=node_ids[j * top_k:(j + 1) * top_k],
+                    )
+        return results
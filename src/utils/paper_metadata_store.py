@@ -0,0 +1,196 @@
+import os
+import uuid
+import fcntl
+import threading
+
+import numpy as np
+from llama_index.core.schema import MetadataMode, TextNode
+
+ROW_DTYPE = np.dtype([
+    ("key", "S16"),
+    ("date", "<f8"),
+    ("offset", "<i8"),
+    ("paper_id_len", "<i4"),
+    ("title_len", "<i4"),
+    ("categories_len", "<i4"),
+    ("text_len", "<i4"),
+])
+EXCLUDED_METADATA_KEYS = ["categories"]
+
+
+def paper_node_id(paper_id):
+    """Node id of a paper in the vector store, see `documents_to_nodes`."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, paper_id))
+
+
+class PaperMetadataStore:
+    """
+    Compact side table of the fields `retrieve_paper` returns, so a search only needs ids and scores
+    from the vector store instead of deserializing every node.
+
+    `rows.bin` holds one fixed-size record per written node (node id, date, offset and lengths of
+    paper_id, title, categories and text), and `strings.bin` the UTF-8 strings the records point
+    to. Both files are append-only and read through memory maps. A sorted array of node ids maps an
+    id to its latest row, rows added after loading are kept in a dict until the next `load`.
+
+    Appends hold an exclusive lock on `rows.lock`, so the ingest script and the daily task of the
+    API can write the same table. Rows appended by another process become visible on `load`.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.rows_path = os.path.join(store_dir, "rows.bin")
+        self.strings_path = os.path.join(store_dir, "strings.bin")
+        self.lock_path = os.path.join(store_dir, "rows.lock")
+        self._lock = threading.RLock()
+        self._rows = None
+        self._strings = None
+        self._sorted_keys = np.zeros(0, dtype="S16")
+        self._sorted_rows = np.zeros(0, dtype=np.int64)
+        self._pending = {}
+        self._num_rows = 0
+
+    @classmethod
+    def for_collection(cls, store_dir, collection_name):
+        return cls(os.path.join(store_dir, collection_name))
+
+    def exists(self):
+        return os.path.exists(self.rows_path)
+
+    def load(self):
+        with self._lock:
+            # Strings are written before their row, a partially written row is dropped
+            self._num_rows = os.path.getsize(self.rows_path) // ROW_DTYPE.itemsize
+            self._rows = self._strings = None
+            keys = self._get_rows()["key"] if self._num_rows else np.zeros(0, dtype="S16")
+
+            # Rows are sorted by key, the latest row of a re-written node wins
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            latest = np.ones(len(order), dtype=bool)
+            latest[:-1] = sorted_keys[:-1] != sorted_keys[1:]
+            self._sorted_keys = sorted_keys[latest]
+            self._sorted_rows = order[latest]
+            self._pending = {}
+        return self
+
+    def __len__(self):
+        return len(self._sorted_keys) + sum(row_id < 0 for row_id in self._lookup_sorted(list(self._pending)))
+
+    def _get_rows(self):
+        if self._rows is None or len(self._rows) < self._num_rows:
+            self._rows = np.memmap(self.rows_path, dtype=ROW_DTYPE, mode="r", shape=(self._num_rows,))
+        return self._rows
+
+    def _get_strings(self, end):
+        if self._strings is None or len(self._strings) < end:
+            self._strings = np.memmap(self.strings_path, dtype=np.uint8, mode="r")
+        return self._strings
+
+    def add_nodes(self, nodes):
+        """Appends the paper nodes written to the vector store."""
+        if not nodes:
+            return
+
+        with self._lock:
+            os.makedirs(self.store_dir, exist_ok=True)
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self._append_rows(nodes)
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _append_rows(self, nodes):
+        # Offsets and row numbers come from the files, other processes may have appended since `load`
+        rows_size = os.path.getsize(self.rows_path) if os.path.exists(self.rows_path) else 0
+        start_row = rows_size // ROW_DTYPE.itemsize
+        offset = os.path.getsize(self.strings_path) if os.path.exists(self.strings_path) else 0
+
+        rows = np.zeros(len(nodes), dtype=ROW_DTYPE)
+        chunks = []
+        for row, node in zip(rows, nodes):
+            fields = [
+                node.metadata["paper_id"], node.metadata["title"], node.metadata.get("categories", ""),
+                node.get_content(metadata_mode=MetadataMode.NONE),
+            ]
+            encoded = [field.encode("utf-8") for field in fields]
+            date = node.metadata.get("date")
+            row["key"] = uuid.UUID(node.node_id).bytes
+            row["date"] = date if isinstance(date, (int, float)) else np.nan
+            row["offset"] = offset
+            row["paper_id_len"], row["title_len"], row["categories_len"], row["text_len"] = map(len, encoded)
+            chunks.extend(encoded)
+            offset += sum(map(len, encoded))
+
+        with open(self.strings_path, "ab") as f:
+            f.write(b"".join(chunks))
+        with open(self.rows_path, "ab") as f:
+            # Drops a partial record left by a crashed writer, complete rows are never truncated
+            if rows_size != start_row * ROW_DTYPE.itemsize:
+                f.truncate(start_row * ROW_DTYPE.itemsize)
+            f.write(rows.tobytes())
+
+        for i, key in enumerate(rows["key"]):
+            self._pending[key] = start_row + i
+        self._num_rows = start_row + len(nodes)
+
+    def _lookup_sorted(self, keys):
+        if not len(self._sorted_keys) or not len(keys):
+            return [-1] * len(keys)
+        keys = np.asarray(keys, dtype="S16")
+        positions = np.minimum(np.searchsorted(self._sorted_keys, keys), len(self._sorted_keys) - 1)
+        return np.where(self._sorted_keys[positions] == keys, self._sorted_rows[positions], -1).tolist()
+
+    def _lookup_rows(self, node_ids):
+        # Keys are numpy bytes everywhere, which drop trailing null bytes the same way
+        keys = np.array([uuid.UUID(node_id).bytes for node_id in node_ids], dtype="S16")
+        return [self._pending.get(key, row_id) for key, row_id in zip(keys, self._lookup_sorted(keys))]
+
+    def get_nodes(self, node_ids):
+        """
+        Returns:
+            list: `TextNode`s with the paper metadata and text in the order of `node_ids`, None for
+                ids that are not in the table.
+        """
+        with self._lock:
+            row_ids = self._lookup_rows(node_ids)
+            rows = self._get_rows() if self._num_rows else None
+
+            nodes = []
+            for node_id, row_id in zip(node_ids, row_ids):
+                if row_id < 0:
+                    nodes.append(None)
+                    continue
+                row = rows[row_id]
+                start = int(row["offset"])
+                lengths = [int(row["paper_id_len"]), int(row["title_len"]), int(row["categories_len"]), int(row["text_len"])]
+                strings = self._get_strings(start + sum(lengths))
+                fields = []
+                for length in lengths:
+                    fields.append(bytes(strings[start:start + length]).decode("utf-8"))
+                    start += length
+                paper_id, title, categories, text = fields
+
+                metadata = {"paper_id": paper_id, "title": title, "date": float(row["date"])}
+                if categories:
+                    metadata["categories"] = categories
+                nodes.append(TextNode(
+                    id_=node_id, text=text, metadata=metadata,
+                    excluded_embed_metadata_keys=EXCLUDED_METADATA_KEYS, excluded_llm_metadata_keys=EXCLUDED_METADATA_KEYS,
+                ))
+            return nodes
+
+
+_metadata_stores = {}
+_metadata_stores_lock = threading.Lock()
+
+
+def get_paper_metadata_store(store_dir, collection_name):
+    """Process-wide metadata table of a collection, shared by the search tool and the daily ingest."""
+    key = (store_dir, collection_name)
+    with _metadata_stores_lock:
+        if key not in _metadata_stores:
+            store = PaperMetadataStore.for_collection(store_dir, collection_name)
+            _metadata_stores[key] = store.load() if store.exists() else store
+        return _metadata_stores[key]
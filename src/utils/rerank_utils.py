@@ -0,0 +1,65 @@
+import threading
+
+from llama_index.core.schema import MetadataMode
+
+from src.constants import cfg, RERANK_MODEL_NAME, RERANK_BATCH_SIZE, RERANK_CACHE_SIZE, RERANK_CACHE_TTL
+from src.utils.cache_utils import TTLCache, register_invalidation
+from src.utils.embedding_utils import normalize_text
+
+
+# (query, paper_id) relevance scores, cleared when new papers are written to the paper collection
+rerank_score_cache = TTLCache(max_size=RERANK_CACHE_SIZE, ttl=RERANK_CACHE_TTL)
+register_invalidation(cfg.MODEL.PAPER_COLLECTION_NAME, rerank_score_cache.clear)
+
+
+class PaperReranker:
+    """
+    Cross-encoder that re-scores retrieved paper nodes against the query on CPU.
+
+    Papers are scored in batches of `batch_size` (query, title + abstract) pairs. Scores are cached
+    per normalized query and `paper_id`, so repeated queries only score the papers they have not
+    seen yet.
+    """
+
+    def __init__(self, model_name=RERANK_MODEL_NAME, batch_size=RERANK_BATCH_SIZE, max_length=512, device="cpu"):
+        from sentence_transformers import CrossEncoder
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._model = CrossEncoder(model_name, max_length=max_length, device=device)
+
+    def score(self, query_str, nodes):
+        query_key = normalize_text(query_str)
+        scores = [rerank_score_cache.get((query_key, node.metadata["paper_id"])) if RERANK_CACHE_SIZE else None for node in nodes]
+        miss_idx = [i for i, score in enumerate(scores) if score is None]
+        if miss_idx:
+            pairs = [
+                (query_str, f"{nodes[i].metadata['title']}\n{nodes[i].get_content(metadata_mode=MetadataMode.NONE)}")
+                for i in miss_idx
+            ]
+            miss_scores = self._model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+            for i, score in zip(miss_idx, miss_scores):
+                scores[i] = float(score)
+                if RERANK_CACHE_SIZE:
+                    rerank_score_cache.set((query_key, nodes[i].metadata["paper_id"]), scores[i])
+        return scores
+
+    def rerank(self, query_str, nodes, top_n):
+        """Returns the `top_n` nodes with the highest cross-encoder score, best first."""
+        if not nodes:
+            return []
+        scores = self.score(query_str, nodes)
+        order = sorted(range(len(nodes)), key=lambda i: scores[i], reverse=True)
+        return [nodes[i] for i in order[:top_n]]
+
+
+_rerankers = {}
+_rerankers_lock = threading.Lock()
+
+
+def get_reranker(model_name=RERANK_MODEL_NAME):
+    """Process-wide cross-encoder, loaded on the first reranked search."""
+    with _rerankers_lock:
+        if model_name not in _rerankers:
+            _rerankers[model_name] = PaperReranker(model_name)
+        return _rerankers[model_name]
@@ -0,0 +1,670 @@
+import os
+import math
+import time
+import queue
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+import chromadb
+import qdrant_client
+from qdrant_client.http import models as rest
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import MetadataMode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    FilterOperator,
+    VectorStoreQuery,
+    VectorStoreQueryMode,
+    VectorStoreQueryResult
+)
+from llama_index.core.vector_stores.utils import metadata_dict_to_node, node_to_metadata_dict
+from llama_index.vector_stores.chroma import ChromaVectorStore
+from llama_index.vector_stores.chroma.base import _to_chroma_filter
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+
+from src.constants import (
+    cfg, CHROMA_PATH, QDRANT_HOST, QDRANT_PORT, QDRANT_GRPC_PORT, QDRANT_PREFER_GRPC, QDRANT_PATH, VECTOR_QUANTIZATION, QUANTIZATION_RESCORE, QUANTIZATION_OVERSAMPLING, PARTITION_BY,
+    LOCAL_INDEX_DIR, HNSW_M, HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH
+)
+from src.utils.local_vector_store import LocalHNSWVectorStore
+
+# Payload of a search result, the paper text is hydrated from the paper metadata table
+QDRANT_RESULT_PAYLOAD = ["paper_id", "title", "date"]
+# Fallback without the metadata table: the whole serialized node, text included, that a node is
+# rebuilt from. The flat metadata copies used for filtering are not fetched
+QDRANT_NODE_PAYLOAD = ["_node_content", "_node_type"]
+
+
+def chunk_list(items, chunk_size):
+    for i in range(0, len(items), chunk_size):
+        yield items[i:i + chunk_size]
+
+
+def write_nodes(vector_store, nodes, write_batch_size=4096):
+    """
+    Writes pre-embedded nodes with large batched upserts, bypassing the docstore and node parsers.
+    Upserts keep re-writing the same paper idempotent.
+    """
+    if not nodes:
+        return
+
+    if isinstance(vector_store, PartitionedVectorStore):
+        for partition_store, partition_nodes in vector_store.group_by_partition(nodes):
+            write_nodes(partition_store, partition_nodes, write_batch_size)
+    elif isinstance(vector_store, ChromaVectorStore):
+        collection = vector_store.client
+        for node_chunk in chunk_list(nodes, write_batch_size):
+            metadatas = []
+            for node in node_chunk:
+                metadata = node_to_metadata_dict(node, remove_text=True, flat_metadata=vector_store.flat_metadata)
+                metadatas.append({key: "" if value is None else value for key, value in metadata.items()})
+
+            collection.upsert(
+                ids=[node.node_id for node in node_chunk],
+                embeddings=[node.get_embedding() for node in node_chunk],
+                metadatas=metadatas,
+                documents=[node.get_content(metadata_mode=MetadataMode.NONE) for node in node_chunk],
+            )
+    elif isinstance(vector_store, QdrantVectorStore):
+        if not vector_store._collection_initialized:
+            vector_store._create_collection(vector_store.collection_name, len(nodes[0].get_embedding()))
+        for node_chunk in chunk_list(nodes, write_batch_size):
+            points, _ = vector_store._build_points(node_chunk)
+            vector_store.client.upsert(collection_name=vector_store.collection_name, points=points, wait=True)
+    else:
+        vector_store.add(nodes)
+
+
+def get_paper_nodes(vector_store, paper_ids):
+    """
+    Fetches the stored nodes of the given papers by their `paper_id` metadata, in the order of
+    `paper_ids`. Papers that are not in the collection are skipped.
+    """
+    if not paper_ids:
+        return []
+
+    nodes = {}
+    if isinstance(vector_store, PartitionedVectorStore):
+        for partition_store in vector_store.partition_stores():
+            nodes.update({node.metadata["paper_id"]: node for node in get_paper_nodes(partition_store, paper_ids)})
+    elif isinstance(vector_store, ChromaVectorStore):
+        result = vector_store.client.get(where={"paper_id": {"$in": list(paper_ids)}}, include=["metadatas", "documents"])
+        for metadata, text in zip(result["metadatas"], result["documents"]):
+            node = metadata_dict_to_node(metadata)
+            node.set_content(text)
+            nodes[node.metadata["paper_id"]] = node
+    elif isinstance(vector_store, QdrantVectorStore):
+        points, _ = vector_store.client.scroll(
+            collection_name=vector_store.collection_name,
+            scroll_filter=rest.Filter(must=[rest.FieldCondition(key="paper_id", match=rest.MatchAny(any=list(paper_ids)))]),
+            limit=len(paper_ids),
+            with_payload=QDRANT_NODE_PAYLOAD,
+        )
+        for point in points:
+            node = metadata_dict_to_node(point.payload)
+            nodes[node.metadata["paper_id"]] = node
+    elif isinstance(vector_store, LocalHNSWVectorStore):
+        nodes.update({node.metadata["paper_id"]: node for node in vector_store.get_nodes_by_paper_ids(list(paper_ids))})
+    else:
+        raise NotImplementedError(f"Fetching nodes is not supported for {type(vector_store).__name__}")
+
+    return [nodes[paper_id] for paper_id in paper_ids if paper_id in nodes]
+
+
+def _to_qdrant_filter(filters):
+    """Qdrant filter of the `date` range and exact-match metadata filters of a query."""
+    if filters is None or not filters.filters:
+        return None
+
+    conditions = []
+    for metadata_filter in filters.filters:
+        if metadata_filter.operator in (FilterOperator.GTE, FilterOperator.GT, FilterOperator.LTE, FilterOperator.LT):
+            bound = {
+                FilterOperator.GTE: "gte", FilterOperator.GT: "gt", FilterOperator.LTE: "lte", FilterOperator.LT: "lt"
+            }[metadata_filter.operator]
+            conditions.append(rest.FieldCondition(key=metadata_filter.key, range=rest.Range(**{bound: metadata_filter.value})))
+        elif metadata_filter.operator == FilterOperator.EQ:
+            conditions.append(rest.FieldCondition(key=metadata_filter.key, match=rest.MatchValue(value=metadata_filter.value)))
+        else:
+            raise NotImplementedError(f"Unsupported filter operator {metadata_filter.operator} for Qdrant batch search")
+    return rest.Filter(must=conditions)
+
+
+def _hydrate_results(vector_store, results, metadata_store, payloads=None):
+    """Sets the nodes of id-only results from the metadata table, ids missing from it are fetched from the store."""
+    node_ids = list(dict.fromkeys(node_id for result in results for node_id in result.ids))
+    nodes = {node_id: node for node_id, node in zip(node_ids, metadata_store.get_nodes(node_ids)) if node is not None}
+    missing_ids = [node_id for node_id in node_ids if node_id not in nodes]
+    if missing_ids:
+        nodes.update({node.node_id: node for node in get_nodes_by_ids(vector_store, missing_ids)})
+    for node_id, payload in (payloads or {}).items():
+        if node_id in nodes:
+            nodes[node_id].metadata.update(payload)
+
+    hydrated = []
+    for result in results:
+        matches = [(node_id, similarity) for node_id, similarity in zip(result.ids, result.similarities) if node_id in nodes]
+        hydrated.append(VectorStoreQueryResult(
+            ids=[node_id for node_id, _ in matches],
+            similarities=[similarity for _, similarity in matches],
+            nodes=[nodes[node_id] for node_id, _ in matches],
+        ))
+    return hydrated
+
+
+def query_batch(vector_store, queries, with_nodes=True, metadata_store=None):
+    """
+    Runs several `VectorStoreQuery`s in one search round trip where the store supports it, results
+    are returned in the order of `queries`. Stores without a batch search are queried one by one.
+    Without `with_nodes` the stores return only ids and scores, the nodes are not deserialized,
+    Qdrant then sends no payload at all.
+
+    With a `metadata_store`, the nodes are read from the paper metadata table: Qdrant only sends
+    the `paper_id`, `title` and `date` payload and the other stores only ids and scores. Without it,
+    Qdrant falls back to sending the whole serialized node.
+    """
+    if not queries:
+        return []
+
+    if with_nodes and metadata_store is not None and not isinstance(vector_store, (PartitionedVectorStore, QdrantVectorStore)):
+        return _hydrate_results(vector_store, query_batch(vector_store, queries, with_nodes=False), metadata_store)
+
+    if isinstance(vector_store, PartitionedVectorStore):
+        # Each partition gets one batch with the queries whose date range overlaps it
+        partition_queries = {}
+        for i, query in enumerate(queries):
+            for partition_store in vector_store.partition_stores(*date_bounds(query.filters)):
+                partition_queries.setdefault(id(partition_store), (partition_store, []))[1].append(i)
+
+        matches = [[] for _ in queries]
+        for partition_store, query_idx in partition_queries.values():
+            for i, result in zip(query_idx, query_batch(partition_store, [queries[i] for i in query_idx], with_nodes, metadata_store)):
+                similarities = result.similarities or [0.0] * len(result.ids or [])
+                matches[i].extend(zip(similarities, result.ids or [], result.nodes or [None] * len(similarities)))
+
+        results = []
+        for query, query_matches in zip(queries, matches):
+            query_matches = sorted(query_matches, key=lambda match: match[0], reverse=True)[:query.similarity_top_k]
+            results.append(VectorStoreQueryResult(
+                similarities=[similarity for similarity, _, _ in query_matches],
+                ids=[node_id for _, node_id, _ in query_matches],
+                nodes=[node for _, _, node in query_matches] if with_nodes else None,
+            ))
+        return results
+    elif isinstance(vector_store, ChromaVectorStore):
+        # Chroma takes one filter and result count per call for all query embeddings
+        groups = {}
+        for i, query in enumerate(queries):
+            where = _to_chroma_filter(query.filters) if query.filters is not None else {}
+            groups.setdefault((repr(where), query.similarity_top_k), (where, []))[1].append(i)
+
+        results = [None] * len(queries)
+        for (_, top_k), (where, query_idx) in groups.items():
+            response = vector_store.client.query(
+                query_embeddings=[queries[i].query_embedding for i in query_idx], n_results=top_k, where=where,
+                include=["metadatas", "documents", "distances"] if with_nodes else ["distances"],
+            )
+            for j, i in enumerate(query_idx):
+                nodes = None
+                if with_nodes:
+                    nodes = []
+                    for metadata, text in zip(response["metadatas"][j], response["documents"][j]):
+                        node = metadata_dict_to_node(metadata)
+                        node.set_content(text)
+                        nodes.append(node)
+                results[i] = VectorStoreQueryResult(
+                    nodes=nodes, ids=response["ids"][j], similarities=[math.exp(-distance) for distance in response["distances"][j]]
+                )
+        return results
+    elif isinstance(vector_store, QdrantVectorStore) and not vector_store.enable_hybrid:
+        search_params = vector_store._search_params() if isinstance(vector_store, QuantizedQdrantVectorStore) else None
+        with_payload = False
+        if with_nodes:
+            with_payload = QDRANT_RESULT_PAYLOAD if metadata_store is not None else QDRANT_NODE_PAYLOAD
+        responses = vector_store.client.search_batch(
+            collection_name=vector_store.collection_name,
+            requests=[
+                rest.SearchRequest(
+                    vector=query.query_embedding,
+                    limit=query.similarity_top_k,
+                    filter=_to_qdrant_filter(query.filters),
+                    params=search_params,
+                    with_payload=with_payload,
+                )
+                for query in queries
+            ],
+        )
+        if not with_nodes or metadata_store is not None:
+            results = [
+                VectorStoreQueryResult(ids=[str(point.id) for point in response], similarities=[point.score for point in response])
+                for response in responses
+            ]
+            if not with_nodes:
+                return results
+            payloads = {str(point.id): point.payload for response in responses for point in response if point.payload}
+            return _hydrate_results(vector_store, results, metadata_store, payloads)
+        return [vector_store.parse_to_query_result(response) for response in responses]
+    elif isinstance(vector_store, LocalHNSWVectorStore):
+        return vector_store.query_batch(queries, with_nodes)
+    return [vector_store.query(query) for query in queries]
+
+
+def get_nodes_by_ids(vector_store, node_ids):
+    """Fetches stored nodes by node id, in the order of `node_ids`. Ids that are not in the collection are skipped."""
+    if not node_ids:
+        return []
+
+    nodes = {}
+    if isinstance(vector_store, PartitionedVectorStore):
+        for partition_store in vector_store.partition_stores():
+            nodes.update({node.node_id: node for node in get_nodes_by_ids(partition_store, node_ids)})
+    elif isinstance(vector_store, ChromaVectorStore):
+        result = vector_store.client.get(ids=list(node_ids), include=["metadatas", "documents"])
+        for metadata, text in zip(result["metadatas"], result["documents"]):
+            node = metadata_dict_to_node(metadata)
+            node.set_content(text)
+            nodes[node.node_id] = node
+    elif isinstance(vector_store, QdrantVectorStore):
+        points = vector_store.client.retrieve(collection_name=vector_store.collection_name, ids=list(node_ids), with_payload=QDRANT_NODE_PAYLOAD)
+        for point in points:
+            nodes[str(point.id)] = metadata_dict_to_node(point.payload)
+    elif isinstance(vector_store, LocalHNSWVectorStore):
+        nodes.update({node.node_id: node for node in vector_store.get_nodes_by_ids(list(node_ids))})
+    else:
+        raise NotImplementedError(f"Fetching nodes is not supported for {type(vector_store).__name__}")
+
+    return [nodes[node_id] for node_id in node_ids if node_id in nodes]
+
+
+class BulkVectorStoreWriter:
+    """
+    Background writer stage between the embedder and the vector store.
+
+    Embedded batches are handed over through a bounded queue, so writes overlap with embedding of the
+    next batch and the embedder blocks when the store falls behind. Batches are written in order and
+    their `on_written` callbacks (e.g. manifest commits) run right after each write.
+    """
+
+    def __init__(self, vector_store, max_queue_size=4, write_batch_size=4096):
+        self.vector_store = vector_store
+        self.write_batch_size = write_batch_size
+        self.num_written = 0
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            nodes, on_written = item
+            if self._error is not None:
+                continue
+            try:
+                write_nodes(self.vector_store, nodes, self.write_batch_size)
+                if on_written is not None:
+                    on_written()
+                self.num_written += len(nodes)
+            except Exception as e:
+                self._error = e
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise RuntimeError("Writing to the vector store failed") from self._error
+
+    def put(self, nodes, on_written=None):
+        """Queues a batch of embedded nodes, blocks while the queue is full."""
+        self._raise_error()
+        self._queue.put((nodes, on_written))
+
+    def close(self):
+        """Waits for all queued batches to be written."""
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def quantization_config(quantization):
+    """Qdrant quantization config for `int8` scalar or `binary` vectors, quantized vectors are kept in RAM."""
+    if quantization == "int8":
+        return rest.ScalarQuantization(
+            scalar=rest.ScalarQuantizationConfig(type=rest.ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    if quantization == "binary":
+        return rest.BinaryQuantization(binary=rest.BinaryQuantizationConfig(always_ram=True))
+    raise ValueError(f"Unsupported quantization {quantization}, expected one of [int8, binary]")
+
+
+class QuantizedQdrantVectorStore(QdrantVectorStore):
+    """
+    Qdrant vector store whose first-stage search runs on int8 or binary quantized vectors.
+
+    The quantized vectors stay in RAM while the float32 originals are moved to disk. With `rescore`
+    the top `similarity_top_k * oversampling` candidates are re-ranked with the original vectors,
+    otherwise the scores of the quantized search are returned as is.
+    """
+
+    _quantization: str = PrivateAttr()
+    _rescore: bool = PrivateAttr()
+    _oversampling: float = PrivateAttr()
+
+    def __init__(self, collection_name: str, quantization: str = "int8", rescore: bool = True, oversampling: float = 2.0, **kwargs: Any):
+        super().__init__(collection_name=collection_name, **kwargs)
+        self._quantization = quantization
+        self._rescore = rescore
+        self._oversampling = oversampling
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "QuantizedQdrantVectorStore"
+
+    def _create_collection(self, collection_name: str, vector_size: int) -> None:
+        if self.enable_hybrid:
+            return super()._create_collection(collection_name, vector_size)
+
+        if not self._collection_exists(collection_name):
+            self._client.create_collection(
+                collection_name=collection_name,
+                vectors_config=rest.VectorParams(size=vector_size, distance=rest.Distance.COSINE, on_disk=True),
+                quantization_config=quantization_config(self._quantization),
+            )
+        self._collection_initialized = True
+
+    def apply_quantization(self):
+        """Quantizes an existing float collection, Qdrant builds the quantized vectors in the background."""
+        if self._collection_exists(self.collection_name):
+            self._client.update_collection(
+                collection_name=self.collection_name,
+                vectors_config={"": rest.VectorParamsDiff(on_disk=True)},
+                quantization_config=quantization_config(self._quantization),
+            )
+
+    def _search_params(self):
+        return rest.SearchParams(
+            quantization=rest.QuantizationSearchParams(ignore=False, rescore=self._rescore, oversampling=self._oversampling)
+        )
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if self.enable_hybrid or query.mode != VectorStoreQueryMode.DEFAULT:
+            return super().query(query, **kwargs)
+
+        query_filter = kwargs.get("qdrant_filters") or self._build_query_filter(query)
+        response = self._client.search(
+            collection_name=self.collection_name,
+            query_vector=query.query_embedding,
+            limit=query.similarity_top_k,
+            query_filter=query_filter,
+            search_params=self._search_params(),
+        )
+        return self.parse_to_query_result(response)
+
+    async def aquery(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if self._aclient is None or self.enable_hybrid or query.mode != VectorStoreQueryMode.DEFAULT:
+            return await super().aquery(query, **kwargs)
+
+        query_filter = kwargs.get("qdrant_filters") or self._build_query_filter(query)
+        response = await self._aclient.search(
+            collection_name=self.collection_name,
+            query_vector=query.query_embedding,
+            limit=query.similarity_top_k,
+            query_filter=query_filter,
+            search_params=self._search_params(),
+        )
+        return self.parse_to_query_result(response)
+
+
+def partition_key(timestamp, partition_by):
+    """`2024` or `2024_05` partition of a `date` timestamp, papers without a date go to `undated`."""
+    if not isinstance(timestamp, (int, float)):
+        return "undated"
+    date = datetime.fromtimestamp(timestamp)
+    return f"{date.year:04d}" if partition_by == "year" else f"{date.year:04d}_{date.month:02d}"
+
+
+def date_bounds(filters):
+    """Start and end `date` timestamps of the metadata filters of a query."""
+    start, end = None, None
+    for metadata_filter in (filters.filters if filters is not None else []):
+        if getattr(metadata_filter, "key", None) != "date":
+            continue
+        if metadata_filter.operator in (FilterOperator.GTE, FilterOperator.GT):
+            start = metadata_filter.value if start is None else max(start, metadata_filter.value)
+        elif metadata_filter.operator in (FilterOperator.LTE, FilterOperator.LT):
+            end = metadata_filter.value if end is None else min(end, metadata_filter.value)
+        elif metadata_filter.operator == FilterOperator.EQ:
+            start, end = metadata_filter.value, metadata_filter.value
+    return start, end
+
+
+class PartitionedVectorStore(BasePydanticVectorStore):
+    """
+    Paper collection sharded into one collection per year or month of the paper `date`, named
+    `<collection>_<partition>`.
+
+    Writes are routed by the `date` metadata. A query with date filters only searches the partitions
+    that overlap the range, each with the original filters, and the results are merged by score, so
+    narrow time windows cost time proportional to the window rather than to the corpus.
+    """
+
+    stores_text: bool = True
+    collection_name: str
+    partition_by: str
+
+    _store_factory: Callable[[str], BasePydanticVectorStore] = PrivateAttr()
+    _list_collections: Callable[[], List[str]] = PrivateAttr()
+    _stores: Dict[str, BasePydanticVectorStore] = PrivateAttr()
+    _lock: Any = PrivateAttr()
+
+    def __init__(self, collection_name: str, partition_by: str, store_factory, list_collections, **kwargs: Any):
+        super().__init__(collection_name=collection_name, partition_by=partition_by, **kwargs)
+        self._store_factory = store_factory
+        self._list_collections = list_collections
+        self._stores = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "PartitionedVectorStore"
+
+    @property
+    def client(self) -> Any:
+        return None
+
+    def _partition_store(self, key):
+        with self._lock:
+            if key not in self._stores:
+                self._stores[key] = self._store_factory(f"{self.collection_name}_{key}")
+            return self._stores[key]
+
+    def partition_keys(self):
+        prefix = f"{self.collection_name}_"
+        return sorted(name[len(prefix):] for name in self._list_collections() if name.startswith(prefix))
+
+    def partition_stores(self, start=None, end=None):
+        """Stores of the existing partitions that overlap the `date` range."""
+        keys = self.partition_keys()
+        if start is not None or end is not None:
+            low = partition_key(start, self.partition_by) if start is not None else ""
+            high = partition_key(end, self.partition_by) if end is not None else "9999"
+            keys = [key for key in keys if key != "undated" and low <= key <= high]
+        return [self._partition_store(key) for key in keys]
+
+    def group_by_partition(self, nodes):
+        groups = {}
+        for node in nodes:
+            groups.setdefault(partition_key(node.metadata.get("date"), self.partition_by), []).append(node)
+        return [(self._partition_store(key), partition_nodes) for key, partition_nodes in groups.items()]
+
+    def add(self, nodes, **add_kwargs: Any) -> List[str]:
+        ids = []
+        for partition_store, partition_nodes in self.group_by_partition(nodes):
+            ids.extend(partition_store.add(partition_nodes, **add_kwargs))
+        return ids
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        # The partition of the previous version is not known, the delete is sent to every partition
+        for partition_store in self.partition_stores():
+            partition_store.delete(ref_doc_id, **delete_kwargs)
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        partition_stores = self.partition_stores(*date_bounds(query.filters))
+        if not partition_stores:
+            return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+        if len(partition_stores) == 1:
+            return partition_stores[0].query(query, **kwargs)
+
+        with ThreadPoolExecutor(max_workers=min(8, len(partition_stores))) as executor:
+            results = list(executor.map(lambda store: store.query(query, **kwargs), partition_stores))
+
+        matches = []
+        for result in results:
+            similarities = result.similarities or [0.0] * len(result.ids or [])
+            matches.extend(zip(similarities, result.ids or [], result.nodes or [None] * len(similarities)))
+        matches = sorted(matches, key=lambda match: match[0], reverse=True)[:query.similarity_top_k]
+        return VectorStoreQueryResult(
+            similarities=[similarity for similarity, _, _ in matches],
+            ids=[node_id for _, node_id, _ in matches],
+            nodes=[node for _, _, node in matches],
+        )
+
+
+_clients = {}
+_vector_stores = {}
+_vector_stores_lock = threading.Lock()
+
+
+def persist_vector_store(vector_store):
+    """Saves stores that keep their index in memory, server-backed stores persist on write."""
+    if isinstance(vector_store, PartitionedVectorStore):
+        for partition_store in vector_store.partition_stores():
+            persist_vector_store(partition_store)
+    elif isinstance(vector_store, LocalHNSWVectorStore):
+        vector_store.persist()
+
+
+def get_vector_store_client():
+    """
+    Process-wide client of the configured `VECTOR_STORE`, opened on first use. The Chroma client
+    keeps its segments and the Qdrant client its HTTP connection pool or gRPC channel open for all
+    collections, tools and tasks of the process.
+    """
+    with _vector_stores_lock:
+        if cfg.MODEL.VECTOR_STORE not in _clients:
+            if cfg.MODEL.VECTOR_STORE == "chroma":
+                _clients["chroma"] = chromadb.PersistentClient(path=CHROMA_PATH)
+            elif cfg.MODEL.VECTOR_STORE == "qdrant" and QDRANT_PATH:
+                # In-process Qdrant on local files, no server needed
+                _clients["qdrant"] = qdrant_client.QdrantClient(path=QDRANT_PATH)
+            elif cfg.MODEL.VECTOR_STORE == "qdrant":
+                _clients["qdrant"] = qdrant_client.QdrantClient(
+                    host=QDRANT_HOST, port=QDRANT_PORT, grpc_port=QDRANT_GRPC_PORT, prefer_grpc=QDRANT_PREFER_GRPC
+                )
+            elif cfg.MODEL.VECTOR_STORE == "local":
+                # The local store has no client, each collection opens its own index files
+                _clients["local"] = None
+            else:
+                raise NotImplementedError()
+        return _clients[cfg.MODEL.VECTOR_STORE]
+
+
+def _list_collections(client):
+    if cfg.MODEL.VECTOR_STORE == "chroma":
+        return [collection.name for collection in client.list_collections()]
+    if cfg.MODEL.VECTOR_STORE == "qdrant":
+        return [collection.name for collection in client.get_collections().collections]
+    return os.listdir(LOCAL_INDEX_DIR) if os.path.isdir(LOCAL_INDEX_DIR) else []
+
+
+def paper_collection_exists(collection_name=None):
+    """Whether the paper collection, or one of its partitions with `PARTITION_BY` set, has been created."""
+    collection_name = collection_name or cfg.MODEL.PAPER_COLLECTION_NAME
+    names = _list_collections(get_vector_store_client())
+    if PARTITION_BY:
+        return any(name.startswith(f"{collection_name}_") for name in names)
+    return collection_name in names
+
+
+def _create_vector_store(client, collection_name):
+    if cfg.MODEL.VECTOR_STORE == "chroma":
+        chroma_collection = client.get_or_create_collection(collection_name)
+        return ChromaVectorStore(chroma_collection=chroma_collection)
+    if cfg.MODEL.VECTOR_STORE == "local":
+        return LocalHNSWVectorStore(
+            persist_dir=os.path.join(LOCAL_INDEX_DIR, collection_name),
+            M=HNSW_M,
+            ef_construction=HNSW_EF_CONSTRUCTION,
+            ef_search=HNSW_EF_SEARCH,
+        )
+
+    if VECTOR_QUANTIZATION:
+        return QuantizedQdrantVectorStore(
+            client=client,
+            collection_name=collection_name,
+            quantization=VECTOR_QUANTIZATION,
+            rescore=QUANTIZATION_RESCORE,
+            oversampling=QUANTIZATION_OVERSAMPLING,
+        )
+    return QdrantVectorStore(client=client, collection_name=collection_name)
+
+
+def _load_vector_store(client, collection_name):
+    # One instance per collection and process, so the search tool sees papers added by the daily task
+    key = (cfg.MODEL.VECTOR_STORE, collection_name)
+    with _vector_stores_lock:
+        if key not in _vector_stores:
+            _vector_stores[key] = _create_vector_store(client, collection_name)
+        return _vector_stores[key]
+
+
+def load_paper_vector_store(collection_name=None):
+    """
+    Shared store of a paper collection for the configured `VECTOR_STORE`, built once per process on
+    the pooled client of `get_vector_store_client`. With `QUANTIZATION` set, the Qdrant collection
+    searches int8 or binary vectors. With `PARTITION_BY` set, the collection is split into one
+    collection per year or month.
+    """
+    collection_name = collection_name or cfg.MODEL.PAPER_COLLECTION_NAME
+
+    if VECTOR_QUANTIZATION and cfg.MODEL.VECTOR_STORE != "qdrant":
+        raise ValueError("Quantized storage is only supported with VECTOR_STORE: qdrant")
+    if PARTITION_BY and PARTITION_BY not in ("year", "month"):
+        raise ValueError(f"Unsupported PARTITION_BY {PARTITION_BY}, expected one of [year, month]")
+    client = get_vector_store_client()
+
+    if not PARTITION_BY:
+        return _load_vector_store(client, collection_name)
+
+    key = (cfg.MODEL.VECTOR_STORE, collection_name, PARTITION_BY)
+    with _vector_stores_lock:
+        if key not in _vector_stores:
+            _vector_stores[key] = PartitionedVectorStore(
+                collection_name=collection_name,
+                partition_by=PARTITION_BY,
+                store_factory=lambda name: _load_vector_store(client, name),
+                list_collections=lambda: _list_collections(client),
+            )
+        return _vector_stores[key]
+
+
+def warm_up_vector_store(vector_store, query_embedding, top_k=10):
+    """
+    Runs one unfiltered search, which opens every partition and faults the index pages of the
+    collection into memory before the first user query.
+
+    Returns:
+        list: Ids of the found nodes, to warm up the node lookups of the caller.
+    """
+    start_time = time.time()
+    result = query_batch(vector_store, [VectorStoreQuery(query_embedding=query_embedding, similarity_top_k=top_k)], with_nodes=False)[0]
+    print(f"Vector store {cfg.MODEL.VECTOR_STORE} warmed up in {time.time() - start_time:.2f}s.")
+    return list(result.ids or [])